@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import shutil
+from functools import lru_cache
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+STATIC_DIR = Path("app/static")
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+TEMPLATES_DIR = Path("app/templates")
+TEMPLATE_BYTECODE_DIR = TEMPLATES_DIR / ".bytecode"
+
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".html", ".json", ".txt"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always produced
+    brotli = None
+
+
+def fingerprint(path: Path) -> str:
+    digest = hashlib.blake2b(path.read_bytes(), digest_size=6).hexdigest()
+    return f"{path.stem}.{digest}{path.suffix}"
+
+
+def build_static_assets() -> dict[str, str]:
+    """
+    Copy every static file to dist/ under a content-hashed name, write .gz (and .br
+    when brotli is installed) variants next to it and return the manifest.
+    """
+    if DIST_DIR.exists():
+        shutil.rmtree(DIST_DIR)
+    DIST_DIR.mkdir(parents=True)
+
+    manifest = {}
+    for source in sorted(STATIC_DIR.rglob("*")):
+        if not source.is_file() or DIST_DIR in source.parents:
+            continue
+
+        relative = source.relative_to(STATIC_DIR)
+        target = DIST_DIR / relative.parent / fingerprint(source)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, target)
+
+        if source.suffix in COMPRESSIBLE_SUFFIXES:
+            data = source.read_bytes()
+            target.with_name(target.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                target.with_name(target.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+        manifest[relative.as_posix()] = target.relative_to(STATIC_DIR).as_posix()
+
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def precompile_templates() -> int:
+    """Compile every template into the bytecode cache used by app.templating."""
+    from app.templating import build_template_env
+
+    env = build_template_env()
+    names = env.list_templates(filter_func=lambda name: not name.startswith("."))
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> dict[str, str]:
+    try:
+        return json.loads(MANIFEST_PATH.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(path: str) -> str:
+    """URL of a static file, fingerprinted when the asset build has been run."""
+    path = path.lstrip("/")
+    return f"/static/{load_manifest().get(path, path)}"
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value (1.0 when omitted)."""
+    qualities = {}
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves the prebuilt .br/.gz variant of fingerprinted assets
+    when the client accepts it, and marks fingerprinted assets as immutable.
+    """
+
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if not path.startswith("dist/"):
+            return await super().get_response(path, scope)
+
+        qualities = parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        wildcard = qualities.get("*", 0.0)
+        # Highest client preference first, ties keep our order (br before gzip); q=0 means "not acceptable"
+        candidates = sorted(self.ENCODINGS, key=lambda item: -qualities.get(item[0], wildcard))
+        response = None
+        for encoding, suffix in candidates:
+            if qualities.get(encoding, wildcard) <= 0:
+                continue
+            try:
+                response = await super().get_response(path + suffix, scope)
+            except HTTPException:
+                continue
+            response.headers["content-encoding"] = encoding
+            media_type, _ = mimetypes.guess_type(path)
+            if media_type:
+                response.headers["content-type"] = media_type
+            break
+
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+if __name__ == "__main__":
+    built = build_static_assets()
+    print(f"Fingerprinted {len(built)} static asset(s) into {DIST_DIR}")
+    print(f"Precompiled {precompile_templates()} template(s) into {TEMPLATE_BYTECODE_DIR}")
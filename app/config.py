@@ -1,6 +1,6 @@
 from functools import lru_cache
+from typing import Literal
 
-from fastapi.templating import Jinja2Templates
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,9 +8,82 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     DEBUG: bool = False
     ENABLE_FILE_LOGGING: bool = True
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    LOG_FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT: int = 5
+    # Fraction of records kept / max records per second, by ``extra={"event": ...}`` name
+    LOG_SAMPLE_RATES: dict[str, float] = {"cache_hit": 0.01}
+    LOG_RATE_LIMITS: dict[str, int] = {"click_metrics_updated": 10, "load_shed": 5}
     KGS_KEY_POOL_SIZE: int = 100
-    TEMPLATE: Jinja2Templates = Jinja2Templates(directory="app/templates")
     BASE_URL: str = "http://localhost:8090"
+    ENABLE_PAGES: bool = True
+    # Cache lifetimes (seconds) for redirects with the "cacheable" policy
+    REDIRECT_MAX_AGE: int = 3600
+    REDIRECT_SHARED_MAX_AGE: int = 86400
+    EXPORT_BATCH_SIZE: int = 5000
+    # Cached redirects expire after URL_CACHE_TTL seconds and are refreshed in the
+    # background once older than URL_CACHE_REFRESH_AFTER; at most MAX_ENTRIES are kept (LRU)
+    URL_CACHE_TTL: float = 600.0
+    URL_CACHE_REFRESH_AFTER: float = 480.0
+    URL_CACHE_MAX_ENTRIES: int = 100_000
+    METRICS_QUEUE_MAXSIZE: int = 50_000
+    # Load shedding: thresholds for the "elevated" level; "critical" is CRITICAL_FACTOR times that
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_POOL_WAIT_MS: float = 100.0
+    ADMISSION_LOOP_LAG_MS: float = 100.0
+    ADMISSION_QUEUE_DEPTH: int = 10_000
+    ADMISSION_CRITICAL_FACTOR: float = 3.0
+    ADMISSION_RETRY_AFTER: int = 2
+    # Optional sharding of url_mapping: shard name -> database URL. Empty keeps it in DATABASE_URL.
+    # Renaming a shard moves its keys, so names must stay stable; see app.database.rebalance.
+    SHARD_DATABASE_URLS: dict[str, str] = {}
+    SHARD_VNODES: int = 128
+    # Shard names before the rebalance in progress, if any: a key missing on its owner is also
+    # looked up, and must be free, on its previous owner until the --prune pass has run
+    SHARD_PREVIOUS_NAMES: list[str] = []
+    # Event-loop watchdog: lag is sampled every INTERVAL seconds; a loop stuck for longer
+    # than BLOCKED_MS gets its stack logged. BLOCKING_CALL_CHECKS (tests/dev) flags known
+    # blocking APIs called from the loop thread.
+    LOOP_WATCHDOG_INTERVAL: float = 0.1
+    LOOP_WATCHDOG_BLOCKED_MS: float = 250.0
+    LOOP_BLOCKING_CALL_CHECKS: bool = False
+    # Idempotency-Key support for POST /u/url. SHARED also records keys in Postgres so
+    # retries landing on another worker are absorbed; WAIT_TIMEOUT bounds how long a
+    # duplicate waits for a request still running elsewhere, and a claim not renewed for
+    # LEASE seconds (its worker died) is taken over by the next retry.
+    IDEMPOTENCY_TTL: float = 86400.0
+    IDEMPOTENCY_MAX_ENTRIES: int = 100_000
+    IDEMPOTENCY_SHARED: bool = False
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 10.0
+    IDEMPOTENCY_LEASE: float = 30.0
+    # Trending links: Space-Saving sketch of TRENDING_CAPACITY counters per window of
+    # TRENDING_WINDOW_SECONDS, TRENDING_WINDOWS windows kept; the top TRENDING_PINNED keys
+    # are pinned in the URL cache
+    TRENDING_CAPACITY: int = 1000
+    TRENDING_WINDOW_SECONDS: float = 60.0
+    TRENDING_WINDOWS: int = 15
+    TRENDING_PINNED: int = 100
+    # In-memory index of used short keys for availability checks, synced every INTERVAL seconds.
+    # Workers on a host share one full load through the SNAPSHOT_PATH file, reloaded from the
+    # database once older than SNAPSHOT_MAX_AGE seconds; no path makes every worker scan the table.
+    KEY_INDEX_ENABLED: bool = True
+    KEY_INDEX_SYNC_INTERVAL: float = 5.0
+    KEY_INDEX_SNAPSHOT_PATH: str | None = ".cache/key_index.bin"
+    KEY_INDEX_SNAPSHOT_MAX_AGE: float = 3600.0
+    CACHE_INVALIDATION_ENABLED: bool = True
+    CACHE_INVALIDATION_CHANNEL: str = "url_mapping_invalidation"
+    # Admin-only endpoints (/admin, export, link listing) require this token in the X-Admin-Token header
+    ADMIN_TOKEN: str | None = None
+    PROFILING_ENABLED: bool = False
+    SERVER_HOST: str = "0.0.0.0"  # noqa: S104
+    SERVER_PORT: int = 8090
+    SERVER_WORKERS: int | None = None  # defaults to the CPUs available to the process
+    SERVER_PRELOAD_APP: bool = True
+    SERVER_MAX_REQUESTS: int | None = None
+    SERVER_MAX_REQUESTS_JITTER: int = 0
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    SERVER_GRACEFUL_TIMEOUT: float = 20.0
+    SHUTDOWN_FLUSH_TIMEOUT: float = 10.0
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -1,19 +1,80 @@
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from app.config import settings
 from app.models.url import URLMapping
 
-_cached_urls: dict[str, URLMapping] = {}
+# short_key -> (mapping, time it was cached), least recently used first.
+# Bounded to URL_CACHE_MAX_ENTRIES by evicting from the front, skipping pinned keys.
+_cached_urls: OrderedDict[str, tuple[URLMapping, float]] = OrderedDict()
+
+# Trending keys (see app.services.trending): never dropped for being older than the TTL,
+# they keep being refreshed in the background instead
+_pinned_keys: frozenset[str] = frozenset()
+
+# Bumped on every eviction so loads that started before it don't store stale data
+_generation = 0
+
+
+def generation() -> int:
+    return _generation
+
+
+def set_url_value(short_key: str, url_mapping: URLMapping, if_generation: int | None = None) -> None:
+    if if_generation is not None and if_generation != _generation:
+        return
+    _cached_urls[short_key] = (url_mapping, time.monotonic())
+    _cached_urls.move_to_end(short_key)
+    if len(_cached_urls) > settings.URL_CACHE_MAX_ENTRIES:
+        _evict_least_recently_used()
 
 
-def set_url_value(short_key: str, url_mapping: URLMapping) -> None:
-    _cached_urls[short_key] = url_mapping
+def _evict_least_recently_used() -> None:
+    while len(_cached_urls) > settings.URL_CACHE_MAX_ENTRIES:
+        # Pinned keys are few, skipping them keeps this cheap
+        victim = next((short_key for short_key in _cached_urls if short_key not in _pinned_keys), None)
+        if victim is None:
+            return
+        del _cached_urls[victim]
+
+
+def get_url_entry(short_key: str) -> tuple[URLMapping, float] | None:
+    """Return the cached mapping and its age in seconds, or None if missing or expired."""
+    entry = _cached_urls.get(short_key)
+    if entry is None:
+        return None
+    url_mapping, cached_at = entry
+    age = time.monotonic() - cached_at
+    if age >= settings.URL_CACHE_TTL and short_key not in _pinned_keys:
+        _cached_urls.pop(short_key, None)
+        return None
+    _cached_urls.move_to_end(short_key)
+    return url_mapping, age
 
 
 def get_url_value(short_key: str) -> URLMapping | None:
-    return _cached_urls.get(short_key)
+    entry = get_url_entry(short_key)
+    return entry[0] if entry else None
+
+
+def pin_url_keys(short_keys: Iterable[str]) -> None:
+    """Replace the set of keys exempt from TTL expiry. Invalidations still evict them."""
+    global _pinned_keys
+    _pinned_keys = frozenset(short_keys)
+
+
+def size() -> int:
+    return len(_cached_urls)
 
 
 def clear_url_cache(short_key: str) -> None:
+    global _generation
+    _generation += 1
     _cached_urls.pop(short_key, None)
 
 
 def reset_url_cache() -> None:
+    global _generation
+    _generation += 1
     _cached_urls.clear()
@@ -1,18 +1,69 @@
+import time
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.config import settings
+from app.database import invalidation  # noqa: F401 - registers the cache invalidation flush hook
+from app.services.admission import admission_controller
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_size=10,
-    max_overflow=5,
-    pool_recycle=3600,
-)
+
+class _InstrumentedQueue(AsyncAdaptedQueue):
+    def get(self, block: bool = True, timeout: float | None = None):
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            admission_controller.record_pool_wait(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that reports how long each checkout waited for a connection.
+
+    Only the wait on the pool's queue is timed: opening a new (overflow)
+    connection is connect latency, not pool contention, and would otherwise
+    shed load while a freshly started worker fills its pool.
+    """
+
+    _queue_class = _InstrumentedQueue
+
+
+# One engine per database: None is DATABASE_URL, other keys are shard names
+_engines: dict[str | None, AsyncEngine] = {}
+
+
+def database_url(shard: str | None = None) -> str:
+    return settings.DATABASE_URL if shard is None else settings.SHARD_DATABASE_URLS[shard]
+
+
+def get_engine(shard: str | None = None) -> AsyncEngine:
+    """
+    Build the async engine on first use instead of at import time.
+    The lifespan calls it during startup so requests never pay for it.
+    """
+    engine = _engines.get(shard)
+    if engine is None:
+        engine = _engines[shard] = create_async_engine(
+            database_url(shard),
+            echo=settings.DEBUG,
+            poolclass=InstrumentedQueuePool,
+            pool_size=10,
+            max_overflow=5,
+            pool_recycle=3600,
+        )
+    return engine
+
+
+async def dispose_engine() -> None:
+    """Close the connection pools of every engine built so far."""
+    while _engines:
+        _, engine = _engines.popitem()
+        await engine.dispose()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -22,17 +73,17 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     It automatically handles closing the session.
     """
 
-    async with AsyncSession(engine) as session:
+    async with AsyncSession(get_engine()) as session:
         yield session
 
 
 @asynccontextmanager
-async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_db_session(shard: str | None = None) -> AsyncGenerator[AsyncSession, None]:
     """
     A standalone context manager for use outside of FastAPI's Depends.
     Ensures the session is properly closed.
     """
-    session = AsyncSession(engine)
+    session = AsyncSession(get_engine(shard))
     try:
         yield session
         await session.commit()
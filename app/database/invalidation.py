@@ -0,0 +1,163 @@
+import asyncio
+from collections.abc import Iterable
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import cache
+from app.logger import logger
+from app.models.url import URLMapping
+
+# Payload sent when every cached entry must be dropped (e.g. bulk rewrites)
+INVALIDATE_ALL = "*"
+
+# Fields that change what a redirect resolves to. Click counters are left out on
+# purpose: invalidating on every click would empty the cache of the hottest links.
+INVALIDATING_FIELDS = ("short_key", "original_url", "redirect_policy")
+
+# Postgres caps NOTIFY payloads at 8000 bytes; keys are at most 8 chars + separator
+_MAX_KEYS_PER_PAYLOAD = 800
+
+
+def _payloads(short_keys: Iterable[str]) -> list[str]:
+    keys = sorted(set(short_keys))
+    if INVALIDATE_ALL in keys:
+        return [INVALIDATE_ALL]
+    return [",".join(keys[i : i + _MAX_KEYS_PER_PAYLOAD]) for i in range(0, len(keys), _MAX_KEYS_PER_PAYLOAD)]
+
+
+def _changed_keys(session: Session) -> set[str]:
+    keys: set[str] = set()
+
+    for obj in session.deleted:
+        if isinstance(obj, URLMapping):
+            keys.add(obj.short_key)
+
+    for obj in session.dirty:
+        if not isinstance(obj, URLMapping):
+            continue
+        state = inspect(obj)
+        for field in INVALIDATING_FIELDS:
+            history = state.attrs[field].history
+            if history.has_changes():
+                keys.add(obj.short_key)
+                # A renamed key must also evict the entry cached under the old name
+                keys.update(value for value in history.deleted if value)
+
+    return keys
+
+
+@event.listens_for(Session, "after_flush")
+def _notify_on_flush(session: Session, flush_context) -> None:
+    """Emit one NOTIFY per flush for the short keys it touched.
+
+    Postgres only delivers notifications when the surrounding transaction commits,
+    so a rolled back write never evicts anything and every key changed in the
+    transaction reaches the listeners together.
+    """
+    keys = _changed_keys(session)
+    if keys:
+        notify_invalidation(session, keys)
+
+
+def notify_invalidation(session: Session, short_keys: Iterable[str]) -> None:
+    """
+    Queue an invalidation notification on the session's current transaction.
+    Use it for Core statements (bulk updates/deletes) that bypass the ORM flush hook.
+    """
+    connection = session.connection()
+    for payload in _payloads(short_keys):
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": settings.CACHE_INVALIDATION_CHANNEL, "payload": payload},
+        )
+
+
+class CacheInvalidationListener:
+    """
+    Keeps a dedicated asyncpg connection LISTENing on the invalidation channel and
+    evicts the notified keys from this worker's local cache.
+
+    Notifications sent while the connection is down are lost, so the whole local
+    cache is dropped every time the connection is lost and again once it is back.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        channel: str,
+        keepalive_interval: float = 30.0,
+        max_backoff: float = 30.0,
+        connect_timeout: float = 5.0,
+    ):
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.keepalive_interval = keepalive_interval
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        if payload == INVALIDATE_ALL:
+            cache.reset_url_cache()
+            logger.info("Received invalidation for all cached urls")
+            return
+
+        for short_key in payload.split(","):
+            cache.clear_url_cache(short_key)
+        logger.debug("Invalidated cached short_keys: %s", payload)
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        self._wakeup.clear()
+        # A database that is down would otherwise hold up stop() for asyncpg's 60s default
+        connection = await asyncpg.connect(self.dsn, timeout=self.connect_timeout)
+        connection.add_termination_listener(lambda _: self._wakeup.set())
+        try:
+            await connection.add_listener(self.channel, self._on_notification)
+            # Anything written while we were not listening may be cached stale
+            cache.reset_url_cache()
+            logger.info(f"Listening for cache invalidations on channel '{self.channel}'")
+
+            while not self._stopping.is_set():
+                try:
+                    # Woken up either by the connection closing or by stop()
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.keepalive_interval)
+                    return
+                except TimeoutError:
+                    # A half-open TCP connection never fires the termination listener
+                    await connection.fetchval("SELECT 1", timeout=self.keepalive_interval)
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+    async def run(self) -> None:
+        backoff = 1.0
+        while not self._stopping.is_set():
+            try:
+                await self._listen()
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+
+            if self._stopping.is_set():
+                break
+
+            cache.reset_url_cache()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=backoff)
+            except TimeoutError:
+                pass
+            backoff = min(backoff * 2, self.max_backoff)
+
+        logger.info("Cache invalidation listener stopped.")
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
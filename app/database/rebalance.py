@@ -0,0 +1,131 @@
+"""
+Move url_mapping rows to the shard that owns them under the configured SHARD_DATABASE_URLS.
+
+Adding a shard moves about 1/N of the keys to it. Roll it out in two passes:
+
+1. Migrate the new database (``alembic -x shard=<name> upgrade head``), add it to
+   SHARD_DATABASE_URLS for this tool only and run it: misplaced rows are copied to
+   their new owner while the app keeps reading them from the old one.
+2. Deploy the new SHARD_DATABASE_URLS together with SHARD_PREVIOUS_NAMES (the shard
+   names before the change), then run the tool again with ``--prune``: rows and
+   clicks written in between are copied again, then deleted from the shards that no
+   longer own them. Until then the app falls back to a key's previous owner, both to
+   read it and to keep it from being created twice.
+3. Deploy again without SHARD_PREVIOUS_NAMES.
+
+A short_key that exists with a different id on its new owner is never merged: the
+copy fails and names the keys, which have to be resolved by hand.
+
+Usage: python -m app.database.rebalance [--prune] [--dry-run] [--batch-size 5000]
+"""
+
+import argparse
+import asyncio
+import uuid
+from collections import Counter
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+
+from app.config import settings
+from app.database.db import dispose_engine, get_db_session
+from app.database.sharding import ShardMap, get_shard_map
+from app.exceptions import DuplicateEntityError
+from app.models.url import URLMapping
+
+
+async def copy_rows(shard: str, url_mappings: list[URLMapping]) -> None:
+    """
+    Upsert rows into ``shard``, keeping the highest click counters on a re-run.
+    Raises DuplicateEntityError, copying nothing, if a short_key is already used
+    there by another row.
+    """
+    stmt = insert(URLMapping).values([url_mapping.model_dump(exclude={"host"}) for url_mapping in url_mappings])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[URLMapping.short_key],
+        set_={
+            "clicks_count": func.greatest(URLMapping.clicks_count, stmt.excluded.clicks_count),
+            "last_clicked_at": func.greatest(URLMapping.last_clicked_at, stmt.excluded.last_clicked_at),
+        },
+        # Only a copy of the same row is merged
+        where=URLMapping.id == stmt.excluded.id,
+    ).returning(URLMapping.short_key)
+    async with get_db_session(shard) as db:
+        copied = set((await db.exec(stmt)).scalars().all())
+        conflicts = sorted(url_mapping.short_key for url_mapping in url_mappings if url_mapping.short_key not in copied)
+        if conflicts:
+            raise DuplicateEntityError("URLMapping", f"short_key on shard {shard!r}", ", ".join(conflicts))
+
+
+async def rebalance_shard(source: str, shard_map: ShardMap, prune: bool, dry_run: bool, batch_size: int) -> Counter:
+    """Walk ``source`` in id order and move every row it no longer owns."""
+    moved: Counter[str] = Counter()
+    last_id: uuid.UUID | None = None
+
+    while True:
+        stmt = select(URLMapping).order_by(URLMapping.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(URLMapping.id > last_id)
+        async with get_db_session(source) as db:
+            rows = list((await db.exec(stmt)).all())
+            db.expunge_all()
+
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        misplaced: dict[str, list[URLMapping]] = {}
+        for url_mapping in rows:
+            owner = shard_map.shard_for(url_mapping.short_key)
+            if owner != source:
+                misplaced.setdefault(owner, []).append(url_mapping)
+
+        for target, url_mappings in misplaced.items():
+            moved[f"{source} -> {target}"] += len(url_mappings)
+            if dry_run:
+                continue
+            await copy_rows(target, url_mappings)
+            if prune:
+                ids = [url_mapping.id for url_mapping in url_mappings]
+                async with get_db_session(source) as db:
+                    await db.exec(delete(URLMapping).where(URLMapping.id.in_(ids)))
+
+        if len(rows) < batch_size:
+            break
+
+    return moved
+
+
+async def rebalance(prune: bool = False, dry_run: bool = False, batch_size: int | None = None) -> Counter:
+    shard_map = get_shard_map()
+    if shard_map is None:
+        raise SystemExit("SHARD_DATABASE_URLS is not set, there is nothing to rebalance")
+
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    results = await asyncio.gather(
+        *(rebalance_shard(shard, shard_map, prune, dry_run, batch_size) for shard in shard_map.shards)
+    )
+    return sum(results, Counter())
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        moved = await rebalance(args.prune, args.dry_run, args.batch_size)
+    except DuplicateEntityError as e:
+        raise SystemExit(f"Rebalance stopped, conflicting rows need to be resolved by hand: {e}") from e
+    finally:
+        await dispose_engine()
+
+    verb = "Would move" if args.dry_run else "Moved" if args.prune else "Copied"
+    for route, count in sorted(moved.items()):
+        print(f"{verb} {count} row(s) {route}")
+    print(f"{verb} {sum(moved.values())} row(s) in total")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move url_mapping rows to the shard that owns them.")
+    parser.add_argument("--prune", action="store_true", help="delete moved rows from their previous shard")
+    parser.add_argument("--dry-run", action="store_true", help="only count the rows that would move")
+    parser.add_argument("--batch-size", type=int, default=None)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,123 @@
+import asyncio
+import bisect
+import hashlib
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from functools import lru_cache
+from typing import TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class ShardMap:
+    """
+    Consistent-hash ring mapping short keys to shard names.
+
+    Each shard owns ``vnodes`` points on the ring and a key belongs to the first
+    point at or after its hash, so adding a shard only moves about 1/N of the
+    keys, all of them to the new shard.
+    """
+
+    def __init__(self, shards: Iterable[str], vnodes: int = 128):
+        self.shards = sorted(shards)
+        if not self.shards:
+            raise ValueError("A shard map needs at least one shard")
+        ring = sorted((_hash(f"{shard}#{i}"), shard) for shard in self.shards for i in range(vnodes))
+        self._points = [point for point, _ in ring]
+        self._owners = [shard for _, shard in ring]
+
+    def shard_for(self, short_key: str) -> str:
+        index = bisect.bisect_left(self._points, _hash(short_key)) % len(self._points)
+        return self._owners[index]
+
+    def group_by_shard(self, short_keys: Iterable[str]) -> dict[str, list[str]]:
+        groups: dict[str, list[str]] = {}
+        for short_key in short_keys:
+            groups.setdefault(self.shard_for(short_key), []).append(short_key)
+        return groups
+
+
+@lru_cache(maxsize=1)
+def get_shard_map() -> ShardMap | None:
+    """The configured shard map, or None when url_mapping lives in DATABASE_URL alone."""
+    if not settings.SHARD_DATABASE_URLS:
+        return None
+    return ShardMap(settings.SHARD_DATABASE_URLS, vnodes=settings.SHARD_VNODES)
+
+
+@lru_cache(maxsize=1)
+def get_previous_shard_map() -> ShardMap | None:
+    """The shard map before the rebalance in progress (SHARD_PREVIOUS_NAMES), or None outside of one."""
+    if not settings.SHARD_PREVIOUS_NAMES or get_shard_map() is None:
+        return None
+    return ShardMap(settings.SHARD_PREVIOUS_NAMES, vnodes=settings.SHARD_VNODES)
+
+
+def shard_for_key(short_key: str) -> str | None:
+    """Shard that owns ``short_key``; None means the default database."""
+    shard_map = get_shard_map()
+    return shard_map.shard_for(short_key) if shard_map else None
+
+
+def previous_shard_for_key(short_key: str) -> str | None:
+    """
+    During a rebalance, the shard that owned ``short_key`` before it when that is
+    another shard: the row may not have been copied to its new owner yet.
+    """
+    previous_map = get_previous_shard_map()
+    if previous_map is None:
+        return None
+    previous = previous_map.shard_for(short_key)
+    return previous if previous != shard_for_key(short_key) else None
+
+
+def shards_for_key(short_key: str) -> list[str | None]:
+    """Where to look ``short_key`` up, in order: its owner, then its previous owner during a rebalance."""
+    previous = previous_shard_for_key(short_key)
+    return [shard_for_key(short_key)] if previous is None else [shard_for_key(short_key), previous]
+
+
+def group_keys_by_shard(short_keys: Iterable[str]) -> dict[str | None, list[str]]:
+    shard_map = get_shard_map()
+    if shard_map is None:
+        return {None: list(short_keys)}
+    return shard_map.group_by_shard(short_keys)
+
+
+def group_keys_by_previous_shard(short_keys: Iterable[str]) -> dict[str, list[str]]:
+    """The keys that moved in the rebalance in progress, grouped by the shard that owned them before."""
+    groups: dict[str, list[str]] = {}
+    for short_key in short_keys:
+        previous = previous_shard_for_key(short_key)
+        if previous is not None:
+            groups.setdefault(previous, []).append(short_key)
+    return groups
+
+
+def all_shards() -> list[str | None]:
+    shard_map = get_shard_map()
+    return list(shard_map.shards) if shard_map else [None]
+
+
+def unique_by_id(rows: Iterable[T]) -> Iterator[T]:
+    """
+    Drop rows whose ``id`` equals the previous row's. During a rebalance a row is on
+    both its old and new shard, and a merge ordered by a key ending in id puts the
+    two copies next to each other.
+    """
+    last_id = None
+    for row in rows:
+        row_id = row["id"] if isinstance(row, dict) else row.id
+        if row_id != last_id:
+            last_id = row_id
+            yield row
+
+
+async def fan_out(fn: Callable[[str | None], Awaitable[T]]) -> list[T]:
+    """Run ``fn`` against every shard concurrently, results in shard order."""
+    return list(await asyncio.gather(*(fn(shard) for shard in all_shards())))
@@ -1,9 +1,12 @@
+import secrets
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Header
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.config import settings
 from app.database.db import get_db
+from app.exceptions import AuthenticationError
 from app.services.url import URLService
 
 DBSessionDep = Annotated[AsyncSession, Depends(get_db)]
@@ -11,3 +14,8 @@ DBSessionDep = Annotated[AsyncSession, Depends(get_db)]
 
 def get_url_service(db: DBSessionDep) -> URLService:  # type: ignore
     return URLService(db)
+
+
+def require_admin(x_admin_token: Annotated[str | None, Header()] = None) -> None:
+    if not settings.ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise AuthenticationError("Missing or invalid admin token")
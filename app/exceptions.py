@@ -42,12 +42,26 @@ class ValidationError(BaseError):
         super().__init__(f"Validation error for {field_name}: {message}")
 
 
+class AuthenticationError(BaseError):
+    """Exception raised when a request lacks valid credentials."""
+
+    pass
+
+
 class ServiceError(BaseError):
     """Exception raised for service-level errors."""
 
     pass
 
 
+class OverloadedError(ServiceError):
+    """Exception raised when a request is shed because the service is overloaded."""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__("Service temporarily overloaded, please retry")
+
+
 class ExternalServiceError(ServiceError):
     """Exception raised when external service calls fail."""
 
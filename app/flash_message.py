@@ -1,11 +1,6 @@
 from typing import Dict, List, Literal
 
 from fastapi import Request
-from jinja2 import Environment, FileSystemLoader
-
-# A simple Jinja2 environment to demonstrate the concept
-# In your app, this would be part of your main setup
-templates = Environment(loader=FileSystemLoader("templates"), autoescape=True)
 
 
 def flash_message(
@@ -0,0 +1,220 @@
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import time
+
+import uvicorn
+
+from app.config import settings
+from app.logger import configure_unified_logging, logger, stop_logging
+
+# Delay before replacing a crashed worker, doubled on every crash in a row
+RESTART_BACKOFF_MIN = 0.5
+RESTART_BACKOFF_MAX = 30.0
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup v2 CPU quota (containers)."""
+    cpus = os.process_cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        return cpus
+    if quota == "max":
+        return cpus
+    return max(1, min(cpus, int(quota) // int(period)))
+
+
+class PreforkSupervisor:
+    """
+    Binds the listening socket once, optionally imports the application up front and
+    then forks the workers, so every worker shares the warmed-up interpreter state
+    copy-on-write instead of importing the whole stack on its own.
+
+    Workers that exit on their own (e.g. after reaching the max requests limit) are
+    replaced; a worker that crashes is restarted with exponential backoff so a broken
+    deployment does not fork in a tight loop. On SIGTERM/SIGINT every worker is asked
+    to drain and is killed once the shutdown deadline has passed.
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        workers: int,
+        preload: bool,
+        shutdown_deadline: float,
+        max_requests_jitter: int = 0,
+    ):
+        self.config = config
+        self.max_requests_jitter = max_requests_jitter
+        self.workers = workers
+        self.preload = preload
+        self.shutdown_deadline = shutdown_deadline
+        # Worker pid -> start time
+        self.children: dict[int, float] = {}
+        self.stopping = False
+        self.restart_delay = 0.0
+        self.pending_spawns: list[float] = []
+
+    def _spawn(self, sock: socket.socket) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        # Worker process: drop the supervisor handlers and let uvicorn install its own
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            if self.config.limit_max_requests is not None and self.max_requests_jitter:
+                # Staggered so the workers don't all recycle at once (this config is the child's copy)
+                self.config.limit_max_requests += random.randint(0, self.max_requests_jitter)  # noqa: S311
+            server = uvicorn.Server(self.config)
+            server.run(sockets=[sock])
+            if not server.started:
+                # A failed lifespan startup returns normally; it must not pass for a clean exit
+                logger.error("Worker failed to start")
+                exit_code = 3
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            logger.exception("Worker crashed")
+            exit_code = 1
+        finally:
+            # os._exit skips atexit, drain the log queue (and the crash record) first
+            stop_logging()
+            os._exit(exit_code)
+
+    def _handle_stop(self, sig: int, frame) -> None:
+        if not self.stopping:
+            logger.info(f"Received {signal.Signals(sig).name}, draining {len(self.children)} worker(s)...")
+        self.stopping = True
+
+    def _signal_children(self, sig: int) -> None:
+        for pid in self.children:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self) -> list[tuple[int, int, float]]:
+        """Collect exited workers as (pid, exit code, seconds it ran)."""
+        exited = []
+        for pid in list(self.children):
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+                exit_code = os.waitstatus_to_exitcode(status) if done else 0
+            except ChildProcessError:
+                done, exit_code = pid, 1
+            if done:
+                started_at = self.children.pop(pid)
+                exited.append((pid, exit_code, time.monotonic() - started_at))
+        return exited
+
+    def _schedule_replacement(self, pid: int, exit_code: int, uptime: float) -> None:
+        if exit_code == 0 or uptime > RESTART_BACKOFF_MAX:
+            # A clean exit (max requests) or a crash after a healthy run is replaced right away
+            self.restart_delay = 0.0
+            logger.info(f"Worker {pid} exited, starting a replacement")
+        else:
+            self.restart_delay = min(max(self.restart_delay * 2, RESTART_BACKOFF_MIN), RESTART_BACKOFF_MAX)
+            logger.warning(
+                f"Worker {pid} crashed with exit code {exit_code}, restarting it in {self.restart_delay:.1f}s"
+            )
+        self.pending_spawns.append(time.monotonic() + self.restart_delay)
+
+    def run(self) -> None:
+        sock = self.config.bind_socket()
+
+        if self.preload:
+            self.config.load()
+            # Keep the warmed-up objects out of the collector so forked workers don't
+            # touch (and copy) their pages on the first GC pass
+            gc.collect()
+            gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        logger.info(f"Starting {self.workers} worker(s) on {self.config.host}:{self.config.port}")
+        for _ in range(self.workers):
+            self._spawn(sock)
+
+        while not self.stopping:
+            for pid, exit_code, uptime in self._reap():
+                self._schedule_replacement(pid, exit_code, uptime)
+            now = time.monotonic()
+            due = [at for at in self.pending_spawns if at <= now]
+            self.pending_spawns = [at for at in self.pending_spawns if at > now]
+            for _ in due:
+                if not self.stopping:
+                    self._spawn(sock)
+            time.sleep(0.1 if self.pending_spawns else 0.5)
+
+        self._signal_children(signal.SIGTERM)
+
+        deadline = time.monotonic() + self.shutdown_deadline
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+
+        if self.children:
+            logger.warning(f"{len(self.children)} worker(s) did not stop within {self.shutdown_deadline}s, killing")
+            self._signal_children(signal.SIGKILL)
+        while self.children:
+            self._reap()
+            time.sleep(0.1)
+
+        sock.close()
+        logger.info("All workers stopped.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run Trimmly with multiple pre-forked workers.")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS or available_cpus())
+    parser.add_argument("--max-requests", type=int, default=settings.SERVER_MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.SERVER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=settings.SERVER_PRELOAD_APP)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    configure_unified_logging()
+
+    config = uvicorn.Config(
+        "app.server:app",
+        host=args.host,
+        port=args.port,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        limit_max_requests=args.max_requests,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        # Logging is configured by app.logger, keep uvicorn from replacing it
+        log_config=None,
+    )
+
+    # Requests get SERVER_GRACEFUL_TIMEOUT to finish, then the lifespan shutdown gets
+    # SHUTDOWN_FLUSH_TIMEOUT to flush metrics and close the pools
+    deadline = settings.SERVER_GRACEFUL_TIMEOUT + settings.SHUTDOWN_FLUSH_TIMEOUT + 5
+    PreforkSupervisor(
+        config,
+        workers=args.workers,
+        preload=args.preload,
+        shutdown_deadline=deadline,
+        max_requests_jitter=args.max_requests_jitter,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,31 +4,80 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 from app.config import settings
+from app.database.db import database_url, dispose_engine, get_engine
+from app.database.invalidation import CacheInvalidationListener
+from app.database.sharding import all_shards
 from app.logger import logger
+from app.services.key_index import key_index
 from app.services.kgs import fill_key_pool
 from app.services.metrics import metrics_queue, metrics_worker
+from app.services.watchdog import loop_watchdog
 
 # Our worker task variable, so we can cancel it later
 metrics_worker_task = None
+invalidation_listener_tasks = []
+loop_watchdog_task = None
+key_index_task = None
+
+# How long shutdown waits for the invalidation listeners to close before cancelling them
+LISTENER_STOP_TIMEOUT = 2.0
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up application...")
 
+    for shard in all_shards():
+        get_engine(shard)
     fill_key_pool(pool_size=settings.KGS_KEY_POOL_SIZE)
 
     global metrics_worker_task
     metrics_worker_task = asyncio.create_task(metrics_worker())
 
+    global key_index_task
+    if settings.KEY_INDEX_ENABLED:
+        key_index_task = asyncio.create_task(key_index.run(settings.KEY_INDEX_SYNC_INTERVAL))
+
+    global loop_watchdog_task
+    loop_watchdog_task = asyncio.create_task(loop_watchdog.run())
+
+    # Writes to url_mapping happen on its shards, so each one is listened to
+    invalidation_listeners = []
+    if settings.CACHE_INVALIDATION_ENABLED:
+        for shard in all_shards():
+            listener = CacheInvalidationListener(database_url(shard), settings.CACHE_INVALIDATION_CHANNEL)
+            invalidation_listeners.append(listener)
+            invalidation_listener_tasks.append(asyncio.create_task(listener.run()))
+
     yield
 
     logger.info("Shutting down application...")
 
-    await metrics_queue.put(None)  # Signal the worker to exit
-    logger.info("Sent shutdown signal to metrics worker.")
-    await metrics_queue.join()  # Wait until all tasks are processed
-    logger.info("Metrics queue has been fully processed.")
+    loop_watchdog_task.cancel()
+    if key_index_task is not None:
+        key_index_task.cancel()
+
+    for listener in invalidation_listeners:
+        listener.stop()
+    if invalidation_listener_tasks:
+        _, pending = await asyncio.wait(invalidation_listener_tasks, timeout=LISTENER_STOP_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    invalidation_listener_tasks.clear()
+
+    async def flush_metrics() -> None:
+        # The queue is bounded: even queueing the exit signal may wait for the worker
+        await metrics_queue.put(None)  # Signal the worker to exit
+        logger.info("Sent shutdown signal to metrics worker.")
+        await metrics_queue.join()
+
+    try:
+        # Wait until all tasks are processed, but never past the shutdown deadline
+        await asyncio.wait_for(flush_metrics(), timeout=settings.SHUTDOWN_FLUSH_TIMEOUT)
+        logger.info("Metrics queue has been fully processed.")
+    except TimeoutError:
+        logger.warning(f"Metrics flush timed out, dropping {metrics_queue.qsize()} pending task(s).")
     metrics_worker_task.cancel()
 
     # Wait for the task to be cancelled.
@@ -39,3 +88,6 @@ async def lifespan(app: FastAPI):
         logger.info("Worker task cancelled successfully.")
     except Exception as e:
         logger.warning(f"Exception during worker task cancellation: {e}")
+
+    await dispose_engine()
+    logger.info("Database connection pool closed.")
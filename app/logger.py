@@ -1,5 +1,11 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import random
 import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 
@@ -8,6 +14,9 @@ def clear_existing_logs() -> None:
     Clear existing log files and reset logger configurations.
     Call this manually when needed to reset logging state.
     """
+    # Stop the background writer first so it releases the log file
+    stop_logging()
+
     # First close all file handlers to release file locks
     for logger_name in list(logging.Logger.manager.loggerDict.keys()):
         logger = logging.getLogger(logger_name)
@@ -48,39 +57,190 @@ def clear_existing_logs() -> None:
     print("Cleared all existing logger configurations")
 
 
+class SamplingFilter(logging.Filter):
+    """
+    Thin out hot-path log lines tagged with ``extra={"event": "<name>"}``.
+
+    ``sample_rates`` keeps roughly that fraction of the records for an event, while
+    ``rate_limits`` caps an event to that many records per second. Records without
+    an ``event`` attribute, and WARNING or above, always pass.
+    """
+
+    def __init__(self, sample_rates: dict[str, float] | None = None, rate_limits: dict[str, int] | None = None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limits = rate_limits or {}
+        self._windows: dict[str, tuple[int, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+
+        rate = self.sample_rates.get(event)
+        if rate is not None and random.random() >= rate:  # noqa: S311
+            return False
+
+        limit = self.rate_limits.get(event)
+        if limit is not None:
+            second = int(record.created)
+            window, count = self._windows.get(event, (second, 0))
+            if window != second:
+                window, count = second, 0
+            if count >= limit:
+                return False
+            self._windows[event] = (window, count + 1)
+
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Render each record as one JSON object per line, including any ``extra`` fields."""
+
+    _RESERVED = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        payload.update({key: value for key, value in record.__dict__.items() if key not in self._RESERVED})
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    Hand the record over untouched; the stock QueueHandler formats the message
+    here, on the caller's thread, which is exactly what we want to keep off the
+    event loop. Formatting happens in the listener thread instead.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# Background thread that drains the log queue into the real handlers
+_queue_listener: QueueListener | None = None
+
+# Set in forked workers, which must never write the supervisor's log file
+_is_forked_worker = False
+
+
+def _process_log_path(path: Path) -> Path:
+    """``path`` itself in the main process, ``<stem>.<pid><suffix>`` in a forked worker."""
+    if not _is_forked_worker:
+        return path
+    return path.with_name(f"{path.stem}.{os.getpid()}{path.suffix}")
+
+
+def _per_process_file_handler(handler: RotatingFileHandler) -> RotatingFileHandler:
+    """
+    Same rotating log file settings, on a file of this process only (``trimmly.<pid>.log``):
+    rotation renames the file, which is unsafe with several processes writing to it.
+    """
+    child_handler = RotatingFileHandler(
+        _process_log_path(Path(handler.baseFilename)),
+        maxBytes=handler.maxBytes,
+        backupCount=handler.backupCount,
+        encoding=handler.encoding,
+    )
+    child_handler.setLevel(handler.level)
+    child_handler.setFormatter(handler.formatter)
+    # Only closes the child's copy of the inherited file descriptor
+    handler.close()
+    return child_handler
+
+
+def _restart_listener_after_fork() -> None:
+    """Threads don't survive fork(); give the child its own queue, listener and log file."""
+    global _queue_listener, _is_forked_worker
+    _is_forked_worker = True
+    if _queue_listener is None:
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            handler.queue = log_queue
+    handlers = [
+        _per_process_file_handler(handler) if isinstance(handler, RotatingFileHandler) else handler
+        for handler in _queue_listener.handlers
+    ]
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def stop_logging() -> None:
+    """Flush pending records and stop the background logging thread."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
 def configure_unified_logging(enable_file_logging: bool | None = None) -> None:
     """
     Configure unified logging for the entire application, including FastAPI/Uvicorn.
+
+    Loggers only push records onto an in-memory queue; a background QueueListener
+    formats them and writes to the console and the size-rotated log file. Forked
+    workers each write their own ``logs/trimmly.<pid>.log``, also when they call
+    this again after the fork (e.g. importing app.server without preloading).
     """
-    # Determine if file logging should be enabled
-    if enable_file_logging is None:
-        try:
-            from app.config import settings
+    global _queue_listener
 
-            file_logging_enabled = settings.ENABLE_FILE_LOGGING
-        except Exception:
-            file_logging_enabled = True
-    else:
-        file_logging_enabled = enable_file_logging
+    try:
+        from app.config import settings
+
+        file_logging_default = settings.ENABLE_FILE_LOGGING
+        log_format = settings.LOG_FORMAT
+        max_bytes = settings.LOG_FILE_MAX_BYTES
+        backup_count = settings.LOG_FILE_BACKUP_COUNT
+        sample_rates = settings.LOG_SAMPLE_RATES
+        rate_limits = settings.LOG_RATE_LIMITS
+    except Exception:
+        file_logging_default = True
+        log_format = "text"
+        max_bytes = 10 * 1024 * 1024
+        backup_count = 5
+        sample_rates, rate_limits = {}, {}
+
+    # Determine if file logging should be enabled
+    file_logging_enabled = file_logging_default if enable_file_logging is None else enable_file_logging
 
     # Create unified formatter
-    formatter = logging.Formatter(
-        fmt="%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    if log_format == "json":
+        formatter: logging.Formatter = JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S%z")
+    else:
+        formatter = logging.Formatter(
+            fmt="%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
 
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
 
     # Clear existing handlers
+    stop_logging()
     root_logger.handlers.clear()
 
+    handlers: list[logging.Handler] = []
+
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
 
     # File handler (optional)
     if file_logging_enabled:
@@ -88,13 +248,26 @@ def configure_unified_logging(enable_file_logging: bool | None = None) -> None:
             log_dir = Path("logs")
             log_dir.mkdir(exist_ok=True)
 
-            file_handler = logging.FileHandler(log_dir / "trimmly.log", encoding="utf-8")
+            file_handler = RotatingFileHandler(
+                _process_log_path(log_dir / "trimmly.log"),
+                maxBytes=max_bytes,
+                backupCount=backup_count,
+                encoding="utf-8",
+            )
             file_handler.setLevel(logging.INFO)
             file_handler.setFormatter(formatter)
-            root_logger.addHandler(file_handler)
+            handlers.append(file_handler)
         except Exception as e:
             print(f"Warning: Could not set up file logging: {e}")
 
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rates, rate_limits))
+    root_logger.addHandler(queue_handler)
+
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+
     # Configure specific loggers to use the same format
     loggers_to_configure = ["uvicorn", "uvicorn.access", "uvicorn.error", "fastapi", "trimmly"]
 
@@ -104,6 +277,9 @@ def configure_unified_logging(enable_file_logging: bool | None = None) -> None:
         logger.propagate = True  # Let root logger handle the formatting
 
 
+atexit.register(stop_logging)
+
+
 def get_logger(name: str = "trimmly", enable_file_logging: bool | None = None) -> logging.Logger:
     """
     Get a logger instance that writes to a single log file for the entire application.
@@ -0,0 +1,25 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import DateTime, Field, Index
+
+from app.models.base import BaseSQLModel
+
+
+class IdempotencyKey(BaseSQLModel, table=True):
+    """Outcome of a request sent with an Idempotency-Key, shared by every worker."""
+
+    __tablename__ = "idempotency_key"
+    __table_args__ = (Index("ix_idempotency_key_created_at", "created_at"),)
+
+    key: str = Field(primary_key=True, max_length=255)
+    # Hash of the request body, a key reused for a different request is rejected
+    fingerprint: str = Field(max_length=64, nullable=False)
+    # NULL while the first request is still running
+    response: dict | None = Field(default=None, nullable=True, sa_type=JSONB)
+    # Renewed by the worker running the request, NULL once it completed; a claim not
+    # renewed for IDEMPOTENCY_LEASE seconds was abandoned and may be taken over
+    heartbeat_at: datetime | None = Field(default=None, nullable=True, sa_type=DateTime(timezone=True))
+    # Random per claim: only the request holding the claim may renew, complete or release it
+    claim_token: uuid.UUID | None = Field(default=None, nullable=True)
@@ -1,15 +1,26 @@
 import uuid
 from datetime import datetime
+from enum import StrEnum
 
-from sqlmodel import DateTime, Field
+from sqlmodel import Column, Computed, DateTime, Field, Index, String
 
 from app.models.base import BaseSQLModel
 
 
+class RedirectPolicy(StrEnum):
+    """How a redirect may be cached by browsers and CDNs."""
+
+    # Every visit reaches us and is counted (Cache-Control: no-store)
+    TRACKED = "tracked"
+    # Browsers and CDNs may cache the redirect, visits are not counted
+    CACHEABLE = "cacheable"
+
+
 class URLMappingBase(BaseSQLModel):
     __tablename__ = "url_mapping"
 
-    short_key: str = Field(index=True, unique=True, max_length=8, nullable=False)
+    # Unique index declared on URLMapping.__table_args__
+    short_key: str = Field(max_length=8, nullable=False)
     original_url: str = Field(max_length=2048, nullable=False)
     clicks_count: int = Field(default=0)
     last_clicked_at: datetime | None = Field(
@@ -17,6 +28,12 @@ class URLMappingBase(BaseSQLModel):
         nullable=True,
         sa_type=DateTime(timezone=True),
     )
+    redirect_policy: RedirectPolicy = Field(
+        default=RedirectPolicy.TRACKED,
+        nullable=False,
+        sa_type=String(16),
+        sa_column_kwargs={"server_default": RedirectPolicy.TRACKED.value},
+    )
 
 
 class URLMappingCreate(URLMappingBase):
@@ -28,7 +45,37 @@ class URLMappingUpdate(BaseSQLModel):
     original_url: str | None = Field(default=None, max_length=2048)
     clicks_count: int | None = Field(default=None)
     last_clicked_at: datetime | None = Field(default=None)
+    redirect_policy: RedirectPolicy | None = Field(default=None)
+
+
+# Lower-cased host of original_url, maintained by Postgres as a stored generated column.
+# Truncated to the column width: a longer authority must not make the INSERT fail.
+HOST_EXPRESSION = (
+    r"left(lower(substring(original_url from '^[A-Za-z][A-Za-z0-9+.-]*://(?:[^/?#@]*@)?([^/?#:]+)')), 255)"
+)
 
 
 class URLMapping(URLMappingBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
+    __table_args__ = (
+        # Redirect lookups load the whole row (counters, timestamps), so the index covers nothing
+        # more: including original_url (up to 2 KB) only made it bigger
+        Index("ix_url_mapping_short_key", "short_key", unique=True),
+        Index("ix_url_mapping_host_created_at", "host", "created_at", "id"),
+        Index("ix_url_mapping_created_at", "created_at", "id"),
+        # Keyset for incremental exports (updated_at, id) > (last seen)
+        Index("ix_url_mapping_updated_at", "updated_at", "id"),
+        Index(
+            "ix_url_mapping_original_url_trgm",
+            "original_url",
+            postgresql_using="gin",
+            postgresql_ops={"original_url": "gin_trgm_ops"},
+        ),
+        # Free space on each page lets click updates stay HOT (same page, no index writes)
+        {"postgresql_with": {"fillfactor": 85}},
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    host: str | None = Field(
+        default=None,
+        sa_column=Column(String(255), Computed(HOST_EXPRESSION, persisted=True), nullable=True),
+    )
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+
+from app.dependencies import require_admin
+from app.services.admission import admission_controller
+from app.services.trending import trending_tracker
+from app.services.watchdog import loop_watchdog
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.get("/admission")
+async def admission_status() -> dict:
+    """Current load level, per-signal pressure and shed counters for this worker."""
+    return admission_controller.snapshot()
+
+
+@router.get("/loop")
+async def loop_status() -> dict:
+    """Event-loop lag histogram and the last detected stall for this worker."""
+    return loop_watchdog.snapshot()
+
+
+@router.get("/trending")
+async def trending_sketches() -> list[dict]:
+    """This worker's per-window trending sketches, to be merged with the other workers'."""
+    return trending_tracker.snapshot()
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.dependencies import require_admin
+from app.services.export import ExportFormat, export_url_mappings
+
+# A full dump of every link, so only for admins
+router = APIRouter(prefix="/export", dependencies=[Depends(require_admin)])
+
+MEDIA_TYPES = {ExportFormat.NDJSON: "application/x-ndjson", ExportFormat.CSV: "text/csv"}
+
+
+@router.get("/urls")
+async def export_urls(
+    format: ExportFormat = ExportFormat.NDJSON,
+    since: datetime | None = None,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """Stream every URL mapping (or those updated since ``since``) as NDJSON or CSV."""
+    filename = f"url_mapping.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_url_mappings(format, since=since, compress=gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
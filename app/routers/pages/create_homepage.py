@@ -1,4 +1,5 @@
 import uuid
+from functools import lru_cache
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Form, Request, responses, status
@@ -7,14 +8,23 @@ from fastapi.responses import HTMLResponse
 from app.config import settings
 from app.flash_message import flash_message, get_flashed_messages
 from app.routers.urls import URLServiceDep
+from app.templating import render_template
 
 router = APIRouter()
 
 
+@lru_cache(maxsize=1)
+def empty_shortener_page() -> str:
+    # Without flash messages the page is identical for everyone; render it once
+    return render_template("shortener.html", messages=[])
+
+
 @router.get("/create", response_class=HTMLResponse)
 async def shortener_page(request: Request):
-    context = {"request": request, "messages": get_flashed_messages(request)}
-    return settings.TEMPLATE.TemplateResponse(name="shortener.html", context=context)
+    messages = get_flashed_messages(request)
+    if not messages:
+        return HTMLResponse(empty_shortener_page())
+    return HTMLResponse(render_template("shortener.html", messages=messages))
 
 
 async def get_create_form_data(
@@ -62,13 +72,9 @@ async def shortened_page(url_service: URLServiceDep, request: Request):
         flash_message(request, "There is no valid shortened url. Please try again.", "error")
         return responses.RedirectResponse(url="/p/create")
 
-    context = {
-        "request": request,
-        "shortened_url": f"{settings.BASE_URL}/u/{data.short_key}",
-        "original_url": data.original_url,
-    }
-    return settings.TEMPLATE.TemplateResponse(
-        name="shortened.html",
-        status_code=status.HTTP_308_PERMANENT_REDIRECT,
-        context=context,
+    content = render_template(
+        "shortened.html",
+        shortened_url=f"{settings.BASE_URL}/u/{data.short_key}",
+        original_url=data.original_url,
     )
+    return HTMLResponse(content, status_code=status.HTTP_308_PERMANENT_REDIRECT)
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.dependencies import require_admin
+from app.services.profiling import profiler
+
+router = APIRouter(prefix="/admin/profile", dependencies=[Depends(require_admin)])
+
+StatsLimit = Annotated[int, Query(ge=1, le=500)]
+
+
+@router.post("/cpu", response_class=PlainTextResponse)
+async def profile_cpu(
+    seconds: Annotated[float, Query(gt=0, le=120)] = 10,
+    mode: Literal["sampling", "cprofile"] = "sampling",
+    interval_ms: Annotated[float, Query(ge=1, le=1000)] = 5,
+    limit: StatsLimit = 50,
+) -> str:
+    """
+    Profile this worker for ``seconds``. Sampling returns collapsed stacks for a
+    flamegraph; cprofile returns the top functions by cumulative time.
+    """
+    if mode == "sampling":
+        return await profiler.sample(seconds, interval_ms / 1000)
+    return await profiler.trace(seconds, limit)
+
+
+@router.post("/requests")
+async def arm_request_profile(path: str, count: Annotated[int, Query(ge=1, le=10_000)] = 100) -> dict:
+    """Profile the next ``count`` requests whose path starts with ``path``."""
+    profiler.arm_requests(path, count)
+    return {"path": path, "count": count}
+
+
+@router.get("/requests", response_class=PlainTextResponse)
+async def get_request_profile(limit: StatsLimit = 50) -> str:
+    collected = profiler.collect_requests(limit)
+    if collected is None:
+        raise ValueError("No request profiling session is armed")
+    session, stats = collected
+    return f"# path={session.path} profiled={session.profiled} remaining={session.remaining}\n{stats}"
+
+
+@router.delete("/requests")
+async def disarm_request_profile() -> dict:
+    profiler.disarm_requests()
+    return {"armed": False}
+
+
+@router.post("/memory")
+async def start_memory_trace(frames: Annotated[int, Query(ge=1, le=100)] = 10) -> dict:
+    """Start tracemalloc and take the baseline snapshot."""
+    await asyncio.to_thread(profiler.start_memory, frames)
+    return {"tracing": True, "frames": frames}
+
+
+@router.get("/memory")
+async def memory_diff(group_by: Literal["lineno", "filename", "traceback"] = "lineno", limit: StatsLimit = 25) -> dict:
+    """Allocation growth since the previous call, largest first."""
+    return await asyncio.to_thread(profiler.memory_diff, group_by, limit)
+
+
+@router.delete("/memory")
+async def stop_memory_trace() -> dict:
+    profiler.stop_memory()
+    return {"tracing": False}
@@ -1,12 +1,24 @@
 from fastapi import FastAPI
 
-from app.routers import urls
-from app.routers.pages import create_homepage
+from app.config import settings
+from app.routers import admin, export, trending, urls
 
 
 def set_routes(app: FastAPI):
-    # Pages routes
-    app.include_router(create_homepage.router, prefix="/p", tags=["Pages"])
+    # Pages routes, imported only when enabled so API-only processes skip the templating stack
+    if settings.ENABLE_PAGES:
+        from app.routers.pages import create_homepage
+
+        app.include_router(create_homepage.router, prefix="/p", tags=["Pages"])
 
     # API Routes
     app.include_router(urls.router, tags=["API"])
+    app.include_router(trending.router, tags=["API"])
+    app.include_router(export.router, tags=["API"])
+
+    # Operational routes
+    app.include_router(admin.router, tags=["Admin"])
+    if settings.PROFILING_ENABLED:
+        from app.routers import profiling
+
+        app.include_router(profiling.router, tags=["Admin"])
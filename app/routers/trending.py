@@ -0,0 +1,23 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Query
+
+from app.config import settings
+from app.schemas.url import TrendingResponse, TrendingURL
+from app.services.trending import trending_tracker
+
+# Outside of /u, where every other segment is a short key
+router = APIRouter(prefix="/trending")
+
+
+@router.get("")
+async def trending_urls(
+    limit: Annotated[int, Query(ge=1, le=1000)] = 20,
+    window: Annotated[float | None, Query(gt=0, description="seconds, defaults to every kept window")] = None,
+) -> TrendingResponse:
+    """Most redirected links recently, as seen by this worker. Never touches the database."""
+    sketch = trending_tracker.merged(window)
+    return TrendingResponse(
+        window_seconds=window or settings.TRENDING_WINDOW_SECONDS * settings.TRENDING_WINDOWS,
+        items=[TrendingURL(short_key=key, clicks=clicks, error=error) for key, clicks, error in sketch.top(limit)],
+    )
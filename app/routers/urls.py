@@ -1,41 +1,155 @@
+import asyncio
+import hashlib
+from datetime import datetime
 from functools import partial
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, responses, status
+from fastapi import APIRouter, Depends, Header, Query, responses, status
 
-from app.dependencies import get_url_service
+from app.config import settings
+from app.dependencies import get_url_service, require_admin
 from app.exceptions import EntityNotFoundError
-from app.schemas.url import ShortenURLRequest, ShortenedURLResponse
+from app.models.url import RedirectPolicy
+from app.schemas.url import (
+    BatchLookupRequest,
+    BatchLookupResponse,
+    ExpandedURLResponse,
+    KeyAvailabilityResponse,
+    ShortenURLRequest,
+    ShortenedURLResponse,
+    URLListResponse,
+)
+from app.services.admission import admission_controller
+from app.services.idempotency import idempotency_store, request_fingerprint
 from app.services.metrics import metrics_queue
+from app.services.trending import trending_tracker
 from app.services.url import URLService
 
 router = APIRouter(prefix="/u")
 
 URLServiceDep = Annotated[URLService, Depends(get_url_service)]
+IfNoneMatchHeader = Annotated[str | None, Header()]
+IdempotencyKeyHeader = Annotated[str | None, Header(min_length=1, max_length=255)]
+
+
+def redirect_etag(expanded: ExpandedURLResponse) -> str:
+    digest = hashlib.blake2b(f"{expanded.short_key}:{expanded.long_url}".encode(), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def build_redirect_response(expanded: ExpandedURLResponse, if_none_match: str | None = None) -> responses.Response:
+    """
+    Build the redirect for a link according to its redirect policy.
+    Tracked links are never cached; cacheable links carry an ETag and freshness
+    lifetimes, and a matching If-None-Match is answered with 304.
+    """
+    headers = {"X-Original-URL": expanded.long_url}
+
+    if expanded.redirect_policy == RedirectPolicy.TRACKED:
+        headers["Cache-Control"] = "no-store"
+    else:
+        headers["Cache-Control"] = (
+            f"public, max-age={settings.REDIRECT_MAX_AGE}, s-maxage={settings.REDIRECT_SHARED_MAX_AGE}"
+        )
+        headers["ETag"] = redirect_etag(expanded)
+        if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+            return responses.Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return responses.RedirectResponse(
+        url=expanded.long_url,
+        status_code=status.HTTP_308_PERMANENT_REDIRECT,
+        headers=headers,
+    )
 
 
 @router.post("/url")
-async def create_url(payload: ShortenURLRequest, url_service: URLServiceDep) -> ShortenedURLResponse:
-    short_url = await url_service.shorten_url(payload.long_url, payload.short_key)
+async def create_url(
+    payload: ShortenURLRequest, url_service: URLServiceDep, idempotency_key: IdempotencyKeyHeader = None
+) -> ShortenedURLResponse:
+    """
+    Retries sent with the same Idempotency-Key header get the first response back
+    instead of creating another short URL.
+    """
+    shorten = partial(url_service.shorten_url, payload.long_url, payload.short_key, payload.redirect_policy)
+    if idempotency_key:
+        short_url = await idempotency_store.run(idempotency_key, request_fingerprint(payload), shorten)
+    else:
+        short_url = await shorten()
     return ShortenedURLResponse.model_validate(short_url)
 
 
+@router.get("", dependencies=[Depends(require_admin)])
+async def list_urls(
+    url_service: URLServiceDep,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    cursor: str | None = None,
+    domain: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+    min_clicks: Annotated[int | None, Query(ge=0)] = None,
+    search: Annotated[str | None, Query(min_length=3)] = None,
+) -> URLListResponse:
+    """List links newest first (admin only); pass ``next_cursor`` back as ``cursor`` for the next page."""
+    return await url_service.list_urls(
+        limit=limit,
+        cursor=cursor,
+        domain=domain,
+        created_after=created_after,
+        created_before=created_before,
+        min_clicks=min_clicks,
+        search=search,
+    )
+
+
+@router.post("/lookup")
+async def lookup_urls(payload: BatchLookupRequest, url_service: URLServiceDep) -> BatchLookupResponse:
+    """Resolve up to 5000 short keys at once, without counting clicks."""
+    return await url_service.lookup_urls(payload.short_keys)
+
+
+@router.get("/availability")
+async def key_availability(
+    short_key: Annotated[str, Query(min_length=1, max_length=64)],
+    url_service: URLServiceDep,
+    suggest: Annotated[int, Query(ge=0, le=20)] = 3,
+) -> KeyAvailabilityResponse:
+    """Whether a custom short key is free, with up to ``suggest`` free alternatives when it is not."""
+    return await url_service.check_key_availability(short_key, suggest)
+
+
 @router.get("/{short_key}")
-async def expand_url(short_key: str, url_service: URLServiceDep) -> None:
+async def expand_url(short_key: str, url_service: URLServiceDep, if_none_match: IfNoneMatchHeader = None) -> None:
     try:
         original_url = await url_service.expand_url(short_key)
 
         if not original_url:
             raise EntityNotFoundError("URLMapping", short_key)
 
-        print("error aqui", original_url.long_url)
-        task_callable = partial(url_service.update_click_metrics, short_key)
-        await metrics_queue.put(task_callable)
+        trending_tracker.record(short_key)
 
-        return responses.RedirectResponse(
-            url=original_url.long_url,
-            status_code=status.HTTP_308_PERMANENT_REDIRECT,
-            headers={"X-Original-URL": original_url.long_url, "Cache-Control": "no-store"},
-        )
+        if original_url.redirect_policy == RedirectPolicy.TRACKED:
+            task_callable = partial(url_service.update_click_metrics, short_key)
+            try:
+                metrics_queue.put_nowait(task_callable)
+            except asyncio.QueueFull:
+                # Never make a redirect wait on a backed-up database
+                admission_controller.count("click_dropped")
+
+        return build_redirect_response(original_url, if_none_match)
     except EntityNotFoundError:
         return responses.RedirectResponse(url="url/404", status_code=status.HTTP_308_PERMANENT_REDIRECT)
+
+
+@router.head("/{short_key}")
+async def expand_url_head(short_key: str, url_service: URLServiceDep, if_none_match: IfNoneMatchHeader = None) -> None:
+    """Same headers as GET, for link checkers and preview bots; never counted as a click."""
+    try:
+        original_url = await url_service.expand_url(short_key)
+        return build_redirect_response(original_url, if_none_match)
+    except EntityNotFoundError:
+        return responses.Response(status_code=status.HTTP_404_NOT_FOUND)
@@ -1,14 +1,19 @@
 import uuid
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from app.models.url import URLMapping
+from app.models.url import RedirectPolicy, URLMapping
 
 
 class ShortenURLRequest(BaseModel):
     long_url: str
     short_key: str | None = None
+    redirect_policy: RedirectPolicy = RedirectPolicy.TRACKED
+
+
+class BatchLookupRequest(BaseModel):
+    short_keys: list[str] = Field(min_length=1, max_length=5000)
 
 
 class ShortenedURLResponse(BaseModel):
@@ -22,6 +27,7 @@ class ExpandedURLResponse(BaseModel):
     long_url: str
     clicks_count: int
     last_clicked_at: datetime | None
+    redirect_policy: RedirectPolicy
     created_at: datetime
     updated_at: datetime
 
@@ -33,6 +39,36 @@ class ExpandedURLResponse(BaseModel):
             long_url=url_mapping.original_url,
             clicks_count=url_mapping.clicks_count,
             last_clicked_at=url_mapping.last_clicked_at,
+            redirect_policy=url_mapping.redirect_policy,
             created_at=url_mapping.created_at,
             updated_at=url_mapping.updated_at,
         )
+
+
+class BatchLookupResponse(BaseModel):
+    results: list[ExpandedURLResponse]
+    missing: list[str]
+
+
+class URLListResponse(BaseModel):
+    items: list[ExpandedURLResponse]
+    next_cursor: str | None
+
+
+class TrendingURL(BaseModel):
+    short_key: str
+    # Estimated redirects in the window; overestimates the true count by at most ``error``
+    clicks: int
+    error: int
+
+
+class TrendingResponse(BaseModel):
+    window_seconds: float
+    items: list[TrendingURL]
+
+
+class KeyAvailabilityResponse(BaseModel):
+    short_key: str
+    available: bool
+    reason: str | None = None
+    suggestions: list[str] = []
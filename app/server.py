@@ -1,25 +1,43 @@
 from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 
+from app.config import settings
 from app.exceptions import (
+    AuthenticationError,
     DuplicateEntityError,
     EntityNotFoundError,
     ExternalServiceError,
+    OverloadedError,
     ServiceError,
     ValidationError,
 )
 from app.lifespan import lifespan
 from app.logger import configure_unified_logging, logger
 from app.routers.router import set_routes
+from app.services.admission import AdmissionControlMiddleware
+from app.services.watchdog import LoopWatchdogMiddleware, install_blocking_call_checks
 
 # Set up unified logging before creating the FastAPI app
 configure_unified_logging()
 
+if settings.LOOP_BLOCKING_CALL_CHECKS:
+    install_blocking_call_checks()
+
 app = FastAPI(title="Trimmly", lifespan=lifespan)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-app.add_middleware(SessionMiddleware, secret_key="super-secret-key")  # noqa: S106
+if settings.ENABLE_PAGES:
+    from app.assets import PrecompressedStaticFiles
+
+    app.mount("/static", PrecompressedStaticFiles(directory="app/static"), name="static")
+    app.add_middleware(SessionMiddleware, secret_key="super-secret-key")  # noqa: S106
+
+if settings.PROFILING_ENABLED:
+    from app.services.profiling import ProfilingMiddleware
+
+    app.add_middleware(ProfilingMiddleware)
+
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(LoopWatchdogMiddleware)
 
 set_routes(app)
 
@@ -70,6 +88,15 @@ async def validation_error_exception_handler(request: Request, exc: ValidationEr
     )
 
 
+@app.exception_handler(AuthenticationError)
+async def authentication_error_exception_handler(request: Request, exc: AuthenticationError):
+    """Handle AuthenticationError exceptions."""
+    logger.warning(f"Authentication error: {exc}")
+    return JSONResponse(
+        status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": str(exc), "error_type": "authentication_error"}
+    )
+
+
 @app.exception_handler(ServiceError)
 async def service_error_exception_handler(request: Request, exc: ServiceError):
     """Handle ServiceError exceptions."""
@@ -79,6 +106,16 @@ async def service_error_exception_handler(request: Request, exc: ServiceError):
     )
 
 
+@app.exception_handler(OverloadedError)
+async def overloaded_error_exception_handler(request: Request, exc: OverloadedError):
+    """Handle OverloadedError exceptions."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc), "error_type": "overloaded"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.exception_handler(ExternalServiceError)
 async def external_service_error_exception_handler(request: Request, exc: ExternalServiceError):
     """Handle ExternalServiceError exceptions."""
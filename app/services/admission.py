@@ -0,0 +1,125 @@
+import math
+import time
+from collections import Counter
+from enum import IntEnum
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.logger import logger
+from app.services.kgs import RESERVED_KEYS
+from app.services.metrics import metrics_queue
+
+
+class LoadLevel(IntEnum):
+    NORMAL = 0
+    # Writes and bulk reads are shed, redirects are still served
+    ELEVATED = 1
+    # Only redirects answered from the cache are served
+    CRITICAL = 2
+
+
+class AdmissionController:
+    """
+    Tracks how saturated the process is and decides which requests to turn away.
+
+    Three signals are watched: how long checkouts wait for a DB connection (an
+    exponentially decaying average fed by the connection pool), event-loop lag
+    (reported by the loop watchdog) and the depth of the click metrics queue.
+    Each one is compared to its configured threshold; the worst ratio decides
+    the load level.
+    """
+
+    def __init__(self, decay_seconds: float = 5.0):
+        self.decay_seconds = decay_seconds
+        self.pool_wait = 0.0
+        self.pool_wait_at = 0.0
+        self.loop_lag = 0.0
+        self.shed_counts: Counter[str] = Counter()
+
+    def record_pool_wait(self, seconds: float) -> None:
+        now = time.monotonic()
+        current = self._decayed_pool_wait(now)
+        # Jump straight to a spike, decay slowly back down
+        self.pool_wait = max(seconds, 0.8 * current + 0.2 * seconds)
+        self.pool_wait_at = now
+
+    def _decayed_pool_wait(self, now: float) -> float:
+        # Without checkouts nothing refreshes the average; let it fade so we recover
+        return self.pool_wait * math.exp(-(now - self.pool_wait_at) / self.decay_seconds)
+
+    def pressure(self) -> dict[str, float]:
+        """Each signal as a fraction of its threshold (1.0 = at the threshold)."""
+        return {
+            "pool_wait": self._decayed_pool_wait(time.monotonic()) * 1000 / settings.ADMISSION_POOL_WAIT_MS,
+            "loop_lag": self.loop_lag * 1000 / settings.ADMISSION_LOOP_LAG_MS,
+            "queue_depth": metrics_queue.qsize() / settings.ADMISSION_QUEUE_DEPTH,
+        }
+
+    def level(self) -> LoadLevel:
+        if not settings.ADMISSION_ENABLED:
+            return LoadLevel.NORMAL
+        worst = max(self.pressure().values())
+        if worst >= settings.ADMISSION_CRITICAL_FACTOR:
+            return LoadLevel.CRITICAL
+        if worst >= 1.0:
+            return LoadLevel.ELEVATED
+        return LoadLevel.NORMAL
+
+    def count(self, reason: str) -> None:
+        self.shed_counts[reason] += 1
+
+    def record_loop_lag(self, lag: float) -> None:
+        self.loop_lag = max(lag, 0.7 * self.loop_lag + 0.3 * lag)
+
+    def snapshot(self) -> dict:
+        return {
+            "level": self.level().name.lower(),
+            "pressure": self.pressure(),
+            "shed": dict(self.shed_counts),
+        }
+
+
+admission_controller = AdmissionController()
+
+
+def is_priority_request(method: str, path: str) -> bool:
+    """Redirects, static assets and the admin endpoints are never shed by the middleware."""
+    if path.startswith(("/static/", "/admin/")):
+        return True
+    # /u/{short_key}, but not the named routes (/u/availability, ...) or the /u listing
+    if method not in ("GET", "HEAD") or not path.startswith("/u/") or path.count("/") != 2:
+        return False
+    return path.removeprefix("/u/") not in RESERVED_KEYS
+
+
+class AdmissionControlMiddleware:
+    """
+    Answers non-priority requests with a fast 503 + Retry-After while the process
+    is overloaded, before they queue up for a DB connection.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or is_priority_request(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        level = admission_controller.level()
+        if level == LoadLevel.NORMAL:
+            await self.app(scope, receive, send)
+            return
+
+        admission_controller.count("write" if scope["method"] not in ("GET", "HEAD") else "bulk_read")
+        logger.info(
+            "Shedding %s %s (load %s)", scope["method"], scope["path"], level.name, extra={"event": "load_shed"}
+        )
+        response = JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Service temporarily overloaded, please retry", "error_type": "overloaded"},
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import csv
+import heapq
+import io
+import json
+import sys
+import uuid
+import zlib
+from collections.abc import AsyncIterator, Callable
+from datetime import datetime
+from enum import StrEnum
+from typing import Any
+
+from sqlalchemy import tuple_
+from sqlmodel import select
+
+from app.config import settings
+from app.database.db import dispose_engine, get_db_session
+from app.database.sharding import all_shards
+from app.models.url import URLMapping
+
+EXPORT_COLUMNS = (
+    URLMapping.id,
+    URLMapping.short_key,
+    URLMapping.original_url,
+    URLMapping.clicks_count,
+    URLMapping.last_clicked_at,
+    URLMapping.redirect_policy,
+    URLMapping.created_at,
+    URLMapping.updated_at,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+class ExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+async def iter_url_mapping_batches(
+    since: datetime | None = None, batch_size: int | None = None
+) -> AsyncIterator[list[dict]]:
+    """
+    Yield every URL mapping in id order, or in (updated_at, id) order when
+    ``since`` is given, one page at a time. When sharded, the shards are read
+    side by side and merged on that key, each row once even while a rebalance
+    has it on two shards (copies that differ in updated_at are both exported).
+
+    Pages are read with keyset pagination (past the last seen key), each in its
+    own short transaction, so an export of any size never holds a snapshot open
+    long enough to block vacuum and only a page per shard is in memory at a time.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    shards = all_shards()
+    if len(shards) == 1:
+        async for rows in _iter_shard_batches(shards[0], since, batch_size):
+            yield rows
+        return
+
+    def sort_key(row: dict):
+        return row["id"] if since is None else (row["updated_at"], row["id"])
+
+    merged = _merge_rows([_iter_shard_rows(shard, since, batch_size) for shard in shards], sort_key)
+    batch: list[dict] = []
+    last_id: uuid.UUID | None = None
+    async for row in merged:
+        if row["id"] == last_id:
+            continue
+        last_id = row["id"]
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _iter_shard_rows(shard: str | None, since: datetime | None, batch_size: int) -> AsyncIterator[dict]:
+    async for rows in _iter_shard_batches(shard, since, batch_size):
+        for row in rows:
+            yield row
+
+
+async def _merge_rows(iterators: list[AsyncIterator[dict]], key: Callable[[dict], Any]) -> AsyncIterator[dict]:
+    """heapq.merge for async iterators each sorted by ``key``."""
+    heap = []
+    for index, iterator in enumerate(iterators):
+        row = await anext(iterator, None)
+        if row is not None:
+            heap.append((key(row), index, row))
+    heapq.heapify(heap)
+
+    while heap:
+        _, index, row = heap[0]
+        yield row
+        following = await anext(iterators[index], None)
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (key(following), index, following))
+
+
+async def _iter_shard_batches(shard: str | None, since: datetime | None, batch_size: int) -> AsyncIterator[list[dict]]:
+    last_id: uuid.UUID | None = None
+    last_updated_at: datetime | None = None
+
+    while True:
+        stmt = select(*EXPORT_COLUMNS).limit(batch_size)
+        if since is None:
+            stmt = stmt.order_by(URLMapping.id)
+            if last_id is not None:
+                stmt = stmt.where(URLMapping.id > last_id)
+        else:
+            # Walks ix_url_mapping_updated_at instead of filtering the whole table
+            stmt = stmt.order_by(URLMapping.updated_at, URLMapping.id).where(URLMapping.updated_at >= since)
+            if last_id is not None:
+                stmt = stmt.where(tuple_(URLMapping.updated_at, URLMapping.id) > (last_updated_at, last_id))
+
+        async with get_db_session(shard) as db:
+            rows = [row._asdict() for row in (await db.exec(stmt)).all()]
+
+        if not rows:
+            return
+        yield rows
+
+        if len(rows) < batch_size:
+            return
+        last_id, last_updated_at = rows[-1]["id"], rows[-1]["updated_at"]
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def encode_ndjson(rows: list[dict]) -> str:
+    return "".join(json.dumps({key: _plain(value) for key, value in row.items()}) + "\n" for row in rows)
+
+
+def encode_csv(rows: list[dict], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    if header:
+        writer.writeheader()
+    writer.writerows({key: _plain(value) for key, value in row.items()} for row in rows)
+    return buffer.getvalue()
+
+
+async def export_url_mappings(
+    export_format: ExportFormat = ExportFormat.NDJSON,
+    since: datetime | None = None,
+    compress: bool = False,
+    batch_size: int | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    Stream the url_mapping table as NDJSON or CSV bytes, optionally gzip-compressed
+    on the fly. Memory use is bounded by one page regardless of the table size.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 -> gzip container
+
+    def emit(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    if export_format == ExportFormat.CSV:
+        yield emit(encode_csv([], header=True))
+
+    async for rows in iter_url_mapping_batches(since=since, batch_size=batch_size):
+        chunk = emit(encode_csv(rows) if export_format == ExportFormat.CSV else encode_ndjson(rows))
+        if chunk:
+            yield chunk
+
+    if compressor:
+        yield compressor.flush()
+
+
+async def _export_to_file(args: argparse.Namespace) -> None:
+    output = open(args.output, "wb") if args.output != "-" else sys.stdout.buffer
+    try:
+        async for chunk in export_url_mappings(args.format, args.since, args.gzip, args.batch_size):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export url_mapping as NDJSON or CSV.")
+    parser.add_argument("--format", type=ExportFormat, choices=list(ExportFormat), default=ExportFormat.NDJSON)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only rows updated at or after this ISO time")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    asyncio.run(_export_to_file(parser.parse_args()))
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from pydantic import BaseModel
+from sqlalchemy import delete, or_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+
+from app.config import settings
+from app.database.db import get_db_session
+from app.exceptions import ServiceError, ValidationError
+from app.logger import logger
+from app.models.idempotency import IdempotencyKey
+from app.schemas.url import ShortenedURLResponse
+
+# How often a duplicate polls Postgres while another worker runs the request
+SHARED_POLL_INTERVAL = 0.1
+
+# Expired rows are purged from the shared table once every this many claims
+SHARED_PURGE_EVERY = 1000
+
+
+def request_fingerprint(payload: BaseModel) -> str:
+    return hashlib.blake2b(payload.model_dump_json().encode(), digest_size=16).hexdigest()
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    # Resolved with the response, or the error, of the first request
+    result: asyncio.Future
+    expires_at: float
+
+
+class IdempotencyStore:
+    """
+    Runs each Idempotency-Key at most once and replays its response afterwards.
+
+    Keys live in memory, bounded to ``max_entries`` and dropped after ``ttl``
+    seconds; duplicates arriving while the first request runs await its result.
+    With ``shared`` set the key is also claimed in the idempotency_key table, so
+    a retry routed to another worker waits for, then replays, the same response.
+    The claimant renews a heartbeat while it runs; a claim left behind by a worker
+    that died is taken over once its heartbeat is older than the lease. Each claim
+    has its own token, so a claimant that lost its lease can no longer touch the row.
+    A request that fails is forgotten, so the client can retry it.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, shared: bool = False):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._claims = 0
+
+    def _evict(self, now: float) -> None:
+        # Every entry has the same ttl, so insertion order is expiry order
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.expires_at > now and len(self._entries) < self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _check_fingerprint(stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            raise ValidationError("Idempotency-Key", "Key was already used for a different request")
+
+    async def run(
+        self, key: str, fingerprint: str, fn: Callable[[], Awaitable[ShortenedURLResponse]]
+    ) -> ShortenedURLResponse:
+        now = time.monotonic()
+        self._evict(now)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._check_fingerprint(entry.fingerprint, fingerprint)
+            return await asyncio.shield(entry.result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = _Entry(fingerprint, future, now + self.ttl)
+        try:
+            result = await (self._run_shared(key, fingerprint, fn) if self.shared else fn())
+        except BaseException as e:
+            self._entries.pop(key, None)
+            if isinstance(e, Exception):
+                future.set_exception(e)
+            else:
+                future.set_exception(ServiceError("The original request for this Idempotency-Key was interrupted"))
+            future.exception()  # waiters get it; no "never retrieved" warning if there are none
+            raise
+
+        future.set_result(result)
+        return result
+
+    async def _run_shared(
+        self, key: str, fingerprint: str, fn: Callable[[], Awaitable[ShortenedURLResponse]]
+    ) -> ShortenedURLResponse:
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            claim_token = await self._claim(key, fingerprint)
+            if claim_token is not None:
+                heartbeat = asyncio.create_task(self._heartbeat(key, claim_token))
+                try:
+                    result = await fn()
+                except BaseException:
+                    await self._release(key, claim_token)
+                    raise
+                finally:
+                    heartbeat.cancel()
+                await self._complete(key, claim_token, result)
+                return result
+
+            async with get_db_session() as db:
+                row = (
+                    await db.exec(
+                        select(IdempotencyKey.fingerprint, IdempotencyKey.response).where(IdempotencyKey.key == key)
+                    )
+                ).first()
+            # No row means the other request failed and released the key: try to claim it again
+            if row is not None:
+                self._check_fingerprint(row.fingerprint, fingerprint)
+                if row.response is not None:
+                    return ShortenedURLResponse.model_validate(row.response)
+
+            if time.monotonic() >= deadline:
+                raise ServiceError("A request with this Idempotency-Key is still in progress, please retry")
+            await asyncio.sleep(SHARED_POLL_INTERVAL)
+
+    async def _claim(self, key: str, fingerprint: str) -> uuid.UUID | None:
+        """Claim ``key`` for this request; returns the claim's token, or None if another request holds it."""
+        now = datetime.now(timezone.utc)
+        expired_before = now - timedelta(seconds=self.ttl)
+        abandoned_before = now - timedelta(seconds=settings.IDEMPOTENCY_LEASE)
+        self._claims += 1
+        async with get_db_session() as db:
+            if self._claims % SHARED_PURGE_EVERY == 0:
+                await db.exec(delete(IdempotencyKey).where(IdempotencyKey.created_at < expired_before))
+            # An expired row for this key is replaced rather than replayed, an abandoned claim is taken over
+            await db.exec(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == key,
+                    or_(IdempotencyKey.created_at < expired_before, IdempotencyKey.heartbeat_at < abandoned_before),
+                )
+            )
+            claim_token = uuid.uuid4()
+            claim = IdempotencyKey(key=key, fingerprint=fingerprint, heartbeat_at=now, claim_token=claim_token)
+            stmt = (
+                insert(IdempotencyKey)
+                .values(**claim.model_dump())
+                .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+                .returning(IdempotencyKey.key)
+            )
+            return claim_token if (await db.exec(stmt)).first() is not None else None
+
+    @staticmethod
+    def _owned(key: str, claim_token: uuid.UUID):
+        return IdempotencyKey.key == key, IdempotencyKey.claim_token == claim_token
+
+    async def _heartbeat(self, key: str, claim_token: uuid.UUID) -> None:
+        """Renew the claim on ``key`` while its request runs, so it is not taken for abandoned."""
+        while True:
+            await asyncio.sleep(settings.IDEMPOTENCY_LEASE / 3)
+            try:
+                async with get_db_session() as db:
+                    renewed = await db.exec(
+                        update(IdempotencyKey)
+                        .where(*self._owned(key, claim_token), IdempotencyKey.heartbeat_at.is_not(None))
+                        .values(heartbeat_at=datetime.now(timezone.utc))
+                    )
+            except Exception as e:
+                logger.warning(f"Unable to renew the claim on idempotency key {key}: {e}")
+                continue
+            if renewed.rowcount == 0:
+                logger.warning(f"Lost the lease on idempotency key {key}, another request took it over")
+                return
+
+    async def _release(self, key: str, claim_token: uuid.UUID) -> None:
+        try:
+            async with get_db_session() as db:
+                released = await db.exec(delete(IdempotencyKey).where(*self._owned(key, claim_token)))
+        except Exception as e:
+            # The row will block retries on other workers until its lease runs out
+            logger.warning(f"Unable to release idempotency key {key}: {e}")
+            return
+        if released.rowcount == 0:
+            logger.warning(f"Lost the lease on idempotency key {key}, left it to the request that took it over")
+
+    async def _complete(self, key: str, claim_token: uuid.UUID, result: ShortenedURLResponse) -> None:
+        try:
+            async with get_db_session() as db:
+                completed = await db.exec(
+                    update(IdempotencyKey)
+                    .where(*self._owned(key, claim_token))
+                    .values(
+                        response=result.model_dump(mode="json"),
+                        heartbeat_at=None,
+                        updated_at=datetime.now(timezone.utc),
+                    )
+                )
+        except Exception as e:
+            # The URL was created; only replays on other workers are affected
+            logger.warning(f"Unable to store the response for idempotency key {key}: {e}")
+            return
+        if completed.rowcount == 0:
+            # Replays get the response of the request that took the claim over
+            logger.warning(f"Lost the lease on idempotency key {key}, its response was not stored")
+
+
+idempotency_store = IdempotencyStore(
+    settings.IDEMPOTENCY_TTL, settings.IDEMPOTENCY_MAX_ENTRIES, shared=settings.IDEMPOTENCY_SHARED
+)
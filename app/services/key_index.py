@@ -0,0 +1,237 @@
+import asyncio
+import bisect
+import fcntl
+import heapq
+import os
+import time
+import uuid
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlmodel import select
+
+from app.config import settings
+from app.database.db import get_db_session
+from app.database.sharding import all_shards
+from app.logger import logger
+from app.models.url import URLMapping
+from app.services.kgs import BASE62_CHARS, validate_custom_key
+
+MAX_KEY_LENGTH = 8
+
+# Keys are packed into one integer each, ordered like the strings in ASCII: every
+# character is its rank (1..62) in a base-63 number and missing characters are 0
+KEY_ALPHABET = "".join(sorted(BASE62_CHARS))
+_RANKS = {char: rank for rank, char in enumerate(KEY_ALPHABET, start=1)}
+_BASE = len(KEY_ALPHABET) + 1
+
+# Keys created elsewhere are picked up by created_at; the overlap absorbs clock skew
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Recently added keys are folded into the sorted array, at the next sync, once there are this many
+MERGE_THRESHOLD = 50_000
+
+# How often a worker waiting for another one to write the snapshot checks the lock again
+SNAPSHOT_LOCK_POLL_INTERVAL = 0.5
+
+
+def encode_key(short_key: str) -> int:
+    value = 0
+    for position in range(MAX_KEY_LENGTH):
+        value = value * _BASE + (_RANKS[short_key[position]] if position < len(short_key) else 0)
+    return value
+
+
+class KeyIndex:
+    """
+    Every short_key in use, held in memory to answer availability checks
+    without a database round trip.
+
+    Keys live as packed 8-byte integers in a sorted array (binary search), plus
+    a small set of keys added since the last merge. The index is loaded by
+    streaming url_mapping from every shard at startup, then kept current by
+    local creates and a periodic sync of keys created by other workers.
+
+    With KEY_INDEX_SNAPSHOT_PATH set, the workers of a host share the load: one
+    of them streams the table and writes the array to a snapshot file while the
+    others wait on its lock, then every worker (and every recycled one) starts
+    from the snapshot and syncs the keys created since.
+    """
+
+    def __init__(self):
+        self._sorted = array("Q")
+        self._recent: set[int] = set()
+        self.ready = False
+        self._synced_at: datetime | None = None
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, short_key: str) -> bool:
+        if len(short_key) > MAX_KEY_LENGTH:
+            return False
+        try:
+            value = encode_key(short_key)
+        except (KeyError, IndexError):
+            return False
+        if value in self._recent:
+            return True
+        position = bisect.bisect_left(self._sorted, value)
+        return position < len(self._sorted) and self._sorted[position] == value
+
+    def add(self, short_key: str) -> None:
+        if short_key in self:
+            return
+        self._recent.add(encode_key(short_key))
+
+    async def compact(self) -> None:
+        """Fold the recently added keys into the sorted array, merging off the event loop."""
+        recent = sorted(self._recent)
+        self._sorted = await asyncio.to_thread(lambda: array("Q", heapq.merge(self._sorted, recent)))
+        # Keys added while merging stay in the set
+        self._recent.difference_update(recent)
+
+    def is_free(self, short_key: str) -> bool:
+        return validate_custom_key(short_key)[0] and short_key not in self
+
+    def suggest(self, short_key: str, limit: int) -> list[str]:
+        """Free keys close to ``short_key``: a digit or two appended, then the last character swapped."""
+        suggestions = []
+        for candidate in candidate_keys(short_key):
+            if self.is_free(candidate):
+                suggestions.append(candidate)
+                if len(suggestions) >= limit:
+                    break
+        return suggestions
+
+    async def load(self) -> None:
+        """Start from a fresh enough snapshot if there is one, else stream the keys from the database."""
+        path = settings.KEY_INDEX_SNAPSHOT_PATH
+        if not path:
+            await self.load_from_database()
+            return
+
+        started = time.perf_counter()
+        lock_fd = await _lock_snapshot(Path(path))
+        try:
+            snapshot = await asyncio.to_thread(_read_snapshot, Path(path), settings.KEY_INDEX_SNAPSHOT_MAX_AGE)
+            if snapshot is None:
+                await self.load_from_database()
+                await asyncio.to_thread(_write_snapshot, Path(path), self._sorted, self._synced_at)
+                return
+        finally:
+            os.close(lock_fd)
+
+        self._sorted, self._synced_at = snapshot
+        await self.sync()
+        self.ready = True
+        logger.info(f"Key index loaded {len(self)} keys from {path} in {time.perf_counter() - started:.2f}s")
+
+    async def load_from_database(self) -> None:
+        """Stream every key from every shard, sorting in runs merged at the end."""
+        started = time.perf_counter()
+        synced_at = datetime.now(timezone.utc)
+        # 8 bytes per key, a list of ints would take about 40
+        runs: list[array] = []
+        for shard in all_shards():
+            last_id: uuid.UUID | None = None
+            while True:
+                stmt = select(URLMapping.id, URLMapping.short_key).order_by(URLMapping.id)
+                stmt = stmt.limit(settings.EXPORT_BATCH_SIZE)
+                if last_id is not None:
+                    stmt = stmt.where(URLMapping.id > last_id)
+                async with get_db_session(shard) as db:
+                    rows = (await db.exec(stmt)).all()
+                if not rows:
+                    break
+                runs.append(array("Q", sorted(encode_key(row.short_key) for row in rows)))
+                last_id = rows[-1].id
+
+        self._sorted = await asyncio.to_thread(lambda: array("Q", heapq.merge(*runs)))
+        self._synced_at = synced_at
+        self.ready = True
+        logger.info(f"Key index loaded {len(self._sorted)} keys in {time.perf_counter() - started:.2f}s")
+
+    async def sync(self) -> None:
+        """Add the keys created since the previous load or sync, by any worker."""
+        synced_at = datetime.now(timezone.utc)
+        since = self._synced_at - SYNC_OVERLAP
+        stmt = select(URLMapping.short_key).where(URLMapping.created_at >= since)
+        for shard in all_shards():
+            async with get_db_session(shard) as db:
+                for short_key in (await db.exec(stmt)).all():
+                    self.add(short_key)
+        self._synced_at = synced_at
+
+        if len(self._recent) >= MERGE_THRESHOLD:
+            await self.compact()
+
+    async def run(self, interval: float) -> None:
+        while not self.ready:
+            try:
+                await self.load()
+            except Exception as e:
+                logger.warning(f"Unable to load the key index, retrying: {e}")
+                await asyncio.sleep(interval)
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Unable to sync the key index: {e}")
+
+
+async def _lock_snapshot(path: Path) -> int:
+    """Take the snapshot's lock file, waiting without blocking the event loop while another worker holds it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path.with_name(path.name + ".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            await asyncio.sleep(SNAPSHOT_LOCK_POLL_INTERVAL)
+        except BaseException:
+            os.close(fd)
+            raise
+
+
+def _read_snapshot(path: Path, max_age: float) -> tuple[array, datetime] | None:
+    """The keys and sync time stored at ``path``, or None if missing or older than ``max_age`` seconds."""
+    try:
+        with path.open("rb") as f:
+            header = array("d")
+            header.fromfile(f, 1)
+            synced_at = datetime.fromtimestamp(header[0], timezone.utc)
+            if (datetime.now(timezone.utc) - synced_at).total_seconds() > max_age:
+                return None
+            keys = array("Q")
+            keys.frombytes(f.read())
+    except (OSError, EOFError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable key index snapshot {path}: {e}")
+        return None
+    return keys, synced_at
+
+
+def _write_snapshot(path: Path, keys: array, synced_at: datetime) -> None:
+    # Written aside then renamed, so a reader never sees a partial file
+    partial = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with partial.open("wb") as f:
+        array("d", [synced_at.timestamp()]).tofile(f)
+        keys.tofile(f)
+    partial.replace(path)
+
+
+def candidate_keys(short_key: str):
+    if len(short_key) < MAX_KEY_LENGTH:
+        yield from (short_key + digit for digit in "123456789")
+    if len(short_key) < MAX_KEY_LENGTH - 1:
+        yield from (f"{short_key}{number:02d}" for number in range(10, 100))
+    if short_key:
+        yield from (short_key[:-1] + char for char in KEY_ALPHABET if char != short_key[-1])
+
+
+key_index = KeyIndex()
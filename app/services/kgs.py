@@ -8,6 +8,9 @@ keys_queue = queue.Queue()
 
 BASE62_CHARS = string.digits + string.ascii_letters
 
+# Paths of the other routes under /u, which a short key of the same name would clash with
+RESERVED_KEYS = frozenset({"availability", "lookup", "url"})
+
 
 def generate_key(length: int = 7) -> str:
     return "".join(secrets.choice(BASE62_CHARS) for _ in range(length))
@@ -38,6 +41,8 @@ def validate_custom_key(key: str) -> tuple[bool, str]:
         return False, "Invalid length"
     if not all(c in BASE62_CHARS for c in key):
         return False, "Invalid characters"
+    if key in RESERVED_KEYS:
+        return False, "Reserved key"
     if not validate_key_uniqueness(key):
         return False, "Key already exists"
     return True, ""
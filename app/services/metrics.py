@@ -1,8 +1,10 @@
 import asyncio
 
+from app.config import settings
 from app.logger import logger
 
-metrics_queue: asyncio.Queue = asyncio.Queue()
+# Bounded so a slow database sheds click updates instead of growing without limit
+metrics_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.METRICS_QUEUE_MAXSIZE)
 
 
 async def metrics_worker():
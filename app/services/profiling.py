@@ -0,0 +1,207 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+from app.database import cache
+from app.logger import logger
+from app.services.metrics import metrics_queue
+
+
+def collapse_stack(frame: FrameType | None) -> str:
+    """Render a stack root-first as ``module:function`` frames joined by ``;``."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{Path(code.co_filename).stem}:{code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def format_collapsed(stacks: Counter[str]) -> str:
+    """Collapsed-stack text, as consumed by flamegraph.pl / speedscope / inferno."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def format_stats(profile: cProfile.Profile, limit: int) -> str:
+    output = io.StringIO()
+    pstats.Stats(profile, stream=output).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return output.getvalue()
+
+
+class RequestProfile:
+    """
+    cProfile over the next ``count`` requests whose path starts with ``path``.
+
+    Requests are profiled one at a time; matching requests that arrive while one
+    is being profiled are let through untouched. cProfile sees the whole thread,
+    so whatever else the loop runs while the profiled request awaits is included.
+    """
+
+    def __init__(self, path: str, count: int):
+        self.path = path
+        self.remaining = count
+        self.profiled = 0
+        self.active = False
+        self.profile = cProfile.Profile()
+
+    def claim(self, path: str) -> bool:
+        if self.active or self.remaining <= 0 or not path.startswith(self.path):
+            return False
+        self.active = True
+        self.remaining -= 1
+        return True
+
+    def release(self) -> None:
+        self.active = False
+        self.profiled += 1
+
+
+class Profiler:
+    """
+    On-demand CPU and memory profiling for this worker.
+
+    Nothing is hooked in while idle: the sampling thread, cProfile and
+    tracemalloc only run between the start and the end of a session. Only one
+    CPU session (timed or per-request) can run at a time since Python allows a
+    single active profiler.
+    """
+
+    def __init__(self):
+        self.cpu_busy = False
+        self.request_profile: RequestProfile | None = None
+        self.memory_baseline: tracemalloc.Snapshot | None = None
+
+    def _ensure_cpu_idle(self) -> None:
+        if self.cpu_busy or self.request_profile is not None:
+            raise ValueError("A CPU profiling session is already running")
+
+    async def sample(self, seconds: float, interval: float) -> str:
+        """Sample the event loop thread's stack every ``interval`` seconds, from a helper thread."""
+        self._ensure_cpu_idle()
+        self.cpu_busy = True
+        stacks: Counter[str] = Counter()
+        loop_thread = threading.get_ident()
+        stop = threading.Event()
+
+        def run() -> None:
+            while not stop.wait(interval):
+                frame = sys._current_frames().get(loop_thread)
+                if frame is not None:
+                    stacks[collapse_stack(frame)] += 1
+
+        sampler = threading.Thread(target=run, name="stack-sampler", daemon=True)
+        try:
+            sampler.start()
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            sampler.join()
+            self.cpu_busy = False
+
+        logger.info(f"Sampled {sum(stacks.values())} stacks over {seconds}s")
+        return format_collapsed(stacks)
+
+    async def trace(self, seconds: float, limit: int) -> str:
+        """Run cProfile on the event loop thread for ``seconds``."""
+        self._ensure_cpu_idle()
+        self.cpu_busy = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+            self.cpu_busy = False
+        return format_stats(profile, limit)
+
+    def arm_requests(self, path: str, count: int) -> None:
+        self._ensure_cpu_idle()
+        self.request_profile = RequestProfile(path, count)
+
+    def collect_requests(self, limit: int) -> tuple[RequestProfile, str] | None:
+        """Stats gathered so far; the session ends once all requested requests were profiled."""
+        session = self.request_profile
+        if session is None:
+            return None
+        if session.remaining <= 0 and not session.active:
+            self.request_profile = None
+        return session, format_stats(session.profile, limit)
+
+    def disarm_requests(self) -> None:
+        self.request_profile = None
+
+    def start_memory(self, frames: int) -> None:
+        if tracemalloc.is_tracing():
+            raise ValueError("Memory tracing is already running")
+        tracemalloc.start(frames)
+        self.memory_baseline = self._take_snapshot()
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        # Leave out tracemalloc's own bookkeeping and the import machinery
+        return tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>"))
+        )
+
+    def memory_diff(self, group_by: str, limit: int) -> dict:
+        """
+        Compare a new snapshot to the previous one (or the one taken at start),
+        then make it the baseline for the next call.
+        """
+        if self.memory_baseline is None:
+            raise ValueError("Memory tracing is not running")
+
+        snapshot = self._take_snapshot()
+        stats = snapshot.compare_to(self.memory_baseline, group_by)
+        self.memory_baseline = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "structures": {"cached_urls": cache.size(), "metrics_queue": metrics_queue.qsize()},
+            "top": [
+                {
+                    "location": stat.traceback.format(),
+                    "size_diff": stat.size_diff,
+                    "size": stat.size,
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def stop_memory(self) -> None:
+        self.memory_baseline = None
+        tracemalloc.stop()
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Profiles the requests claimed by an armed RequestProfile; a no-op otherwise."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        session = profiler.request_profile
+        if session is None or scope["type"] != "http" or not session.claim(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        session.profile.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.profile.disable()
+            session.release()
@@ -0,0 +1,47 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.logger import logger
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls per key: the first caller starts the work in its
+    own task and everyone asking for the same key meanwhile awaits that task.
+
+    The work runs detached from the callers, so a caller that is cancelled (e.g.
+    the client went away) doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    def _start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        return await asyncio.shield(self._start(key, fn))
+
+    def do_in_background(self, key: str, fn: Callable[[], Awaitable[Any]]) -> None:
+        """Start the work unless it is already running, without waiting for it."""
+        if key in self._in_flight:
+            return
+        self._start(key, fn).add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh failed: {task.exception()}")
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,146 @@
+import time
+from collections import deque
+from collections.abc import Iterable
+
+from app.config import settings
+from app.database import cache
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch (Metwally et al.) in fixed memory.
+
+    At most ``capacity`` keys are counted. A new key, once full, replaces one of
+    the keys with the lowest count and inherits that count as its error, so a
+    reported count overestimates the true one by at most ``error``. Keys are
+    grouped in buckets by count, which makes ``add`` O(1).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self._buckets: dict[int, set[str]] = {}
+        self._min = 0
+
+    def _move(self, key: str, old: int, new: int) -> None:
+        bucket = self._buckets[old]
+        bucket.discard(key)
+        if not bucket:
+            del self._buckets[old]
+        self._buckets.setdefault(new, set()).add(key)
+        self.counts[key] = new
+
+    def add(self, key: str) -> None:
+        count = self.counts.get(key)
+        if count is not None:
+            self._move(key, count, count + 1)
+            if count == self._min and count not in self._buckets:
+                self._min = count + 1
+            return
+
+        if len(self.counts) < self.capacity:
+            self.counts[key] = 1
+            self.errors[key] = 0
+            self._buckets.setdefault(1, set()).add(key)
+            self._min = 1
+            return
+
+        # Replace one of the least counted keys
+        evicted = next(iter(self._buckets[self._min]))
+        del self.errors[evicted]
+        del self.counts[evicted]
+        self._buckets[self._min].discard(evicted)
+        self.counts[key] = self._min
+        self.errors[key] = self._min
+        self._buckets[self._min].add(key)
+        self._move(key, self._min, self._min + 1)
+        if self._min not in self._buckets:
+            self._min += 1
+
+    def floor(self) -> int:
+        """Most times a key this sketch does not hold may have been added: 0 until it ever evicted."""
+        return self._min if len(self.counts) >= self.capacity else 0
+
+    def top(self, limit: int) -> list[tuple[str, int, int]]:
+        """The ``limit`` most counted keys as (key, count, error), highest first."""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+    def to_dict(self) -> dict:
+        return {"capacity": self.capacity, "counts": self.counts, "errors": self.errors}
+
+    @classmethod
+    def from_counts(cls, capacity: int, counts: dict[str, int], errors: dict[str, int]) -> "SpaceSaving":
+        sketch = cls(capacity)
+        kept = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:capacity]
+        for key, count in kept:
+            sketch.counts[key] = count
+            sketch.errors[key] = errors.get(key, 0)
+            sketch._buckets.setdefault(count, set()).add(key)
+        sketch._min = min(sketch._buckets, default=0)
+        return sketch
+
+    @classmethod
+    def merge(cls, sketches: Iterable["SpaceSaving"], capacity: int | None = None) -> "SpaceSaving":
+        """
+        Combine sketches from other windows or workers (mergeable Space-Saving):
+        counts and errors are summed per key, a sketch that lacks a key adding its
+        ``floor`` to both, and the ``capacity`` largest are kept. Counts still
+        overestimate by at most ``error``.
+        """
+        sketches = list(sketches)
+        floors = [sketch.floor() for sketch in sketches]
+        total_floor = sum(floors)
+        # Start every key at the sum of the floors, then swap in each holding sketch's own values
+        counts: dict[str, int] = {}
+        errors: dict[str, int] = {}
+        for sketch, floor in zip(sketches, floors, strict=True):
+            for key, count in sketch.counts.items():
+                counts[key] = counts.get(key, total_floor) + count - floor
+                errors[key] = errors.get(key, total_floor) + sketch.errors[key] - floor
+        capacity = capacity or max((sketch.capacity for sketch in sketches), default=settings.TRENDING_CAPACITY)
+        return cls.from_counts(capacity, counts, errors)
+
+
+class TrendingTracker:
+    """
+    Heavy hitters of the redirect path over a sliding set of time windows.
+
+    Each window of ``window_seconds`` has its own sketch and the last ``windows``
+    are kept. When a window closes, the current top ``pinned`` keys are pinned in
+    the URL cache so the hottest links never expire from it.
+    """
+
+    def __init__(self, capacity: int, window_seconds: float, windows: int, pinned: int):
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.pinned = pinned
+        self._windows: deque[tuple[int, SpaceSaving]] = deque(maxlen=windows)
+
+    def record(self, short_key: str) -> None:
+        index = int(time.time() // self.window_seconds)
+        if not self._windows or self._windows[-1][0] != index:
+            self._rotate(index)
+        self._windows[-1][1].add(short_key)
+
+    def _rotate(self, index: int) -> None:
+        if self._windows:
+            cache.pin_url_keys(key for key, _, _ in self.merged().top(self.pinned))
+        self._windows.append((index, SpaceSaving(self.capacity)))
+
+    def merged(self, seconds: float | None = None) -> SpaceSaving:
+        """One sketch over the windows that started in the last ``seconds`` (all kept windows by default)."""
+        seconds = seconds or self.window_seconds * self._windows.maxlen
+        oldest = int((time.time() - seconds) // self.window_seconds)
+        sketches = [sketch for index, sketch in self._windows if index >= oldest]
+        return SpaceSaving.merge(sketches, self.capacity)
+
+    def snapshot(self) -> list[dict]:
+        """Per-window sketches, for merging the views of several workers."""
+        return [{"started_at": index * self.window_seconds, **sketch.to_dict()} for index, sketch in self._windows]
+
+
+trending_tracker = TrendingTracker(
+    settings.TRENDING_CAPACITY, settings.TRENDING_WINDOW_SECONDS, settings.TRENDING_WINDOWS, settings.TRENDING_PINNED
+)
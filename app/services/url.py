@@ -1,84 +1,232 @@
+import asyncio
+import base64
+import heapq
+import itertools
 import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import String, any_, bindparam, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.config import settings
 from app.database import cache
 from app.database.db import get_db_session
-from app.exceptions import DuplicateEntityError, EntityNotFoundError
+from app.database.sharding import (
+    fan_out,
+    group_keys_by_previous_shard,
+    group_keys_by_shard,
+    previous_shard_for_key,
+    shard_for_key,
+    shards_for_key,
+    unique_by_id,
+)
+from app.exceptions import (
+    DuplicateEntityError,
+    EntityNotFoundError,
+    OverloadedError,
+    ServiceError,
+    ValidationError,
+)
 from app.logger import logger
-from app.models.url import URLMapping
-from app.schemas.url import ExpandedURLResponse, ShortenedURLResponse
+from app.models.url import RedirectPolicy, URLMapping
+from app.schemas.url import (
+    BatchLookupResponse,
+    ExpandedURLResponse,
+    KeyAvailabilityResponse,
+    ShortenedURLResponse,
+    URLListResponse,
+)
+from app.services.admission import LoadLevel, admission_controller
+from app.services.key_index import candidate_keys, key_index
 from app.services.kgs import get_next_key, validate_custom_key
+from app.services.singleflight import SingleFlight
 from app.utils import smart_url_schema_detection
 
+MAX_GENERATED_KEY_ATTEMPTS = 5
+
+# At most one lookup per short_key is sent to the database at any time
+url_lookups = SingleFlight()
+
+
+async def load_url_mapping(short_key: str) -> URLMapping | None:
+    """
+    Load a mapping in its own session and put it in the cache.
+    Runs detached from any request, see ``url_lookups``.
+    """
+    generation = cache.generation()
+    url_mapping = None
+    for shard in shards_for_key(short_key):
+        async with get_db_session(shard) as db:
+            url_mapping = (await db.exec(select(URLMapping).where(URLMapping.short_key == short_key))).one_or_none()
+            if url_mapping is not None:
+                # Keep the loaded attributes usable after the session commits and closes
+                db.expunge(url_mapping)
+        if url_mapping is not None:
+            break
+
+    if url_mapping is not None:
+        # Skipped if the key was invalidated while we were querying
+        cache.set_url_value(short_key, url_mapping, if_generation=generation)
+    return url_mapping
+
+
+def encode_list_cursor(url_mapping: URLMapping) -> str:
+    raw = f"{url_mapping.created_at.isoformat()}|{url_mapping.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_list_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except ValueError as e:
+        raise ValidationError("cursor", "Invalid pagination cursor") from e
+
 
 class URLService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def save_new_url(self, url_mapping: URLMapping) -> ShortenedURLResponse:
+    @asynccontextmanager
+    async def session_for(self, shard: str | None) -> AsyncIterator[AsyncSession]:
+        """The request's session for the default database, a short-lived one for a shard."""
+        if shard is None:
+            yield self.db
+            return
+        async with get_db_session(shard) as db:
+            try:
+                yield db
+            finally:
+                # Keep the loaded rows usable after the session commits and closes
+                db.expunge_all()
+
+    async def save_new_url(self, url_mapping: URLMapping) -> bool:
         """
-        Save a new shortened URL.
-        Raises DuplicateEntityException if short_key already exists.
+        Save a new shortened URL with a single INSERT ... ON CONFLICT DO NOTHING RETURNING.
+        Returns False, leaving nothing to roll back, if the short_key already exists.
         """
-        try:
-            self.db.add(url_mapping)
-            await self.db.commit()
-            await self.db.refresh(url_mapping)
-            return ShortenedURLResponse(id=url_mapping.id, short_key=url_mapping.short_key)
-        except IntegrityError as e:
-            await self.db.rollback()
-            # Check if it's a unique constraint violation on short_key
-            if "short_key" in str(e.orig):
-                raise DuplicateEntityError("URLMapping", "short_key", url_mapping.short_key) from e
-            # Re-raise the original error if it's not the expected duplicate
-            raise
+        previous_shard = previous_shard_for_key(url_mapping.short_key)
+        if previous_shard is not None:
+            # Mid-rebalance the key may only exist on its previous owner so far
+            async with get_db_session(previous_shard) as db:
+                stmt = select(URLMapping.id).where(URLMapping.short_key == url_mapping.short_key)
+                if (await db.exec(stmt)).first() is not None:
+                    return False
+
+        stmt = (
+            insert(URLMapping)
+            # host is generated by Postgres and must not be written
+            .values(**url_mapping.model_dump(exclude={"host"}))
+            .on_conflict_do_nothing(index_elements=[URLMapping.short_key])
+            .returning(URLMapping.id, URLMapping.created_at)
+        )
+        async with self.session_for(shard_for_key(url_mapping.short_key)) as db:
+            inserted = (await db.exec(stmt)).first()
+            if inserted is None:
+                return False
+            await db.commit()
 
-    async def shorten_url(self, long_url: str, short_key: str = "") -> ShortenedURLResponse:
+        url_mapping.id, url_mapping.created_at = inserted
+        return True
+
+    async def shorten_url(
+        self, long_url: str, short_key: str = "", redirect_policy: RedirectPolicy = RedirectPolicy.TRACKED
+    ) -> ShortenedURLResponse:
         """
         Shorten a long URL.
         """
 
-        if not short_key:
-            # Generate a new short key if not provided
-            short_key = get_next_key()
-        else:
+        if short_key:
             # Validate the provided short key
             is_valid, error_message = validate_custom_key(short_key)
             if not is_valid:
                 raise ValueError(f"Invalid custom short key: {error_message}")
 
         schemed_long_url = smart_url_schema_detection(long_url)
-        new_url_mapping = URLMapping(original_url=schemed_long_url, short_key=short_key)
-        await self.save_new_url(new_url_mapping)
+        new_url_mapping = URLMapping(original_url=schemed_long_url, short_key="", redirect_policy=redirect_policy)
+
+        if short_key:
+            # A custom key is the caller's choice, so a collision is theirs to resolve
+            new_url_mapping.short_key = short_key
+            if not await self.save_new_url(new_url_mapping):
+                key_index.add(short_key)
+                raise DuplicateEntityError("URLMapping", "short_key", short_key)
+        else:
+            # Generated keys can collide too; just draw another one
+            for _ in range(MAX_GENERATED_KEY_ATTEMPTS):
+                new_url_mapping.short_key = get_next_key()
+                if await self.save_new_url(new_url_mapping):
+                    break
+                logger.warning(f"Generated short_key collided, retrying: {new_url_mapping.short_key}")
+            else:
+                raise ServiceError("Could not allocate a unique short key")
 
-        cache.set_url_value(short_key, new_url_mapping)
+        cache.set_url_value(new_url_mapping.short_key, new_url_mapping)
+        key_index.add(new_url_mapping.short_key)
 
-        return ShortenedURLResponse(id=new_url_mapping.id, short_key=short_key)
+        return ShortenedURLResponse(id=new_url_mapping.id, short_key=new_url_mapping.short_key)
+
+    async def check_key_availability(self, short_key: str, suggestions: int = 0) -> KeyAvailabilityResponse:
+        """
+        Tell whether a custom short key can be used, with free alternatives if not.
+        Answered from the in-memory key index; the database is only asked while
+        the index is still loading.
+        """
+        is_valid, error_message = validate_custom_key(short_key)
+        if not is_valid:
+            return KeyAvailabilityResponse(short_key=short_key, available=False, reason=error_message)
+
+        if key_index.ready:
+            if short_key not in key_index:
+                return KeyAvailabilityResponse(short_key=short_key, available=True)
+            return KeyAvailabilityResponse(
+                short_key=short_key,
+                available=False,
+                reason="Key already exists",
+                suggestions=key_index.suggest(short_key, suggestions),
+            )
+
+        if await self.get_one(short_key) is None:
+            return KeyAvailabilityResponse(short_key=short_key, available=True)
+        candidates = [key for key in candidate_keys(short_key) if validate_custom_key(key)[0]][: suggestions * 4]
+        taken = {url_mapping.short_key for url_mapping in await self.get_many(candidates)}
+        return KeyAvailabilityResponse(
+            short_key=short_key,
+            available=False,
+            reason="Key already exists",
+            suggestions=[key for key in candidates if key not in taken][:suggestions],
+        )
 
     async def update_click_metrics(self, short_key: str) -> None:
         """
         Update click metrics for a given short key.
         """
-        async with get_db_session() as db:
-            try:
-                stmt = select(URLMapping).where(URLMapping.short_key == short_key)
-                url_mapping = await db.scalar(stmt)
+        for shard in shards_for_key(short_key):
+            async with get_db_session(shard) as db:
+                try:
+                    stmt = select(URLMapping).where(URLMapping.short_key == short_key)
+                    url_mapping = await db.scalar(stmt)
+
+                    if not url_mapping:
+                        continue
 
-                if not url_mapping:
-                    raise EntityNotFoundError("URLMapping", short_key)
+                    url_mapping.clicks_count += 1
+                    url_mapping.last_clicked_at = datetime.now(timezone.utc)
+                    await db.commit()
+                    await db.refresh(url_mapping)
+                    logger.info(
+                        "Updated click metrics for short_key: %s", short_key, extra={"event": "click_metrics_updated"}
+                    )
+                except Exception as e:
+                    await db.rollback()
+                    logger.warning(f"unable to update click {short_key}: {e}")
+                return
 
-                url_mapping.clicks_count += 1
-                url_mapping.last_clicked_at = datetime.now(timezone.utc)
-                await db.commit()
-                await db.refresh(url_mapping)
-                logger.info(f"Updated click metrics for short_key: {short_key}")
-            except Exception as e:
-                await db.rollback()
-                logger.warning(f"unable to update click {short_key}: {e}")
+        logger.warning(f"unable to update click {short_key}: {EntityNotFoundError('URLMapping', short_key)}")
 
     async def get_one(self, short_key: str) -> URLMapping | None:
         """
@@ -86,8 +234,37 @@ class URLService:
         Raises EntityNotFoundException if no URL mapping is found.
         """
         stmt = select(URLMapping).where(URLMapping.short_key == short_key)
-        url = (await self.db.exec(stmt)).one_or_none()
-        return url
+        for shard in shards_for_key(short_key):
+            async with self.session_for(shard) as db:
+                url_mapping = (await db.exec(stmt)).one_or_none()
+            if url_mapping is not None:
+                return url_mapping
+        return None
+
+    async def get_many(self, short_keys: list[str]) -> list[URLMapping]:
+        """
+        Retrieve the URL mappings for many short keys in a single query.
+        The keys are sent as one array parameter (short_key = ANY(...)) so the
+        statement is the same, and its prepared plan reused, whatever the batch size.
+        When sharded, each shard gets one such query for its keys, all sent concurrently.
+        """
+        if not short_keys:
+            return []
+
+        async def fetch(shard: str | None, keys: list[str]) -> list[URLMapping]:
+            keys_param = bindparam("short_keys", keys, type_=ARRAY(String))
+            stmt = select(URLMapping).where(URLMapping.short_key == any_(keys_param))
+            async with self.session_for(shard) as db:
+                return list((await db.exec(stmt)).all())
+
+        results = await asyncio.gather(*(fetch(shard, keys) for shard, keys in group_keys_by_shard(short_keys).items()))
+        found = [url_mapping for rows in results for url_mapping in rows]
+
+        # Mid-rebalance, keys not copied to their new owner yet are still on the previous one
+        found_keys = {url_mapping.short_key for url_mapping in found}
+        moved = group_keys_by_previous_shard(key for key in short_keys if key not in found_keys)
+        results = await asyncio.gather(*(fetch(shard, keys) for shard, keys in moved.items()))
+        return found + [url_mapping for rows in results for url_mapping in rows]
 
     async def get_one_by_id(self, id: uuid.UUID) -> URLMapping | None:
         """
@@ -95,23 +272,114 @@ class URLService:
         Raises EntityNotFoundException if no URL mapping is found.
         """
         stmt = select(URLMapping).where(URLMapping.id == id)
-        url = (await self.db.exec(stmt)).one_or_none()
-        return url
+
+        async def fetch(shard: str | None) -> URLMapping | None:
+            async with self.session_for(shard) as db:
+                return (await db.exec(stmt)).one_or_none()
+
+        # Ids carry no shard information, so every shard is asked
+        return next((url for url in await fan_out(fetch) if url is not None), None)
 
     async def expand_url(self, short_key: str) -> ExpandedURLResponse:
         """
         Expand a shortened URL and update metrics.
         Raises EntityNotFoundException if short_key is not found.
         """
-        cached_url = cache.get_url_value(short_key)
+        cached = cache.get_url_entry(short_key)
 
-        if cached_url:
-            logger.info(f"Cache hit for short_key: {short_key}")
+        if cached:
+            cached_url, age = cached
+            logger.info("Cache hit for short_key: %s", short_key, extra={"event": "cache_hit"})
+            if age >= settings.URL_CACHE_REFRESH_AFTER:
+                # Serve the current entry and refresh it before it expires
+                url_lookups.do_in_background(short_key, lambda: load_url_mapping(short_key))
             return ExpandedURLResponse.from_url_mapping(cached_url)
 
-        url_mapping = await self.get_one(short_key)
+        if admission_controller.level() == LoadLevel.CRITICAL:
+            admission_controller.count("cache_miss")
+            raise OverloadedError(settings.ADMISSION_RETRY_AFTER)
+
+        # Concurrent misses for the same key share a single query
+        url_mapping = await url_lookups.do(short_key, lambda: load_url_mapping(short_key))
 
         if not url_mapping:
             raise EntityNotFoundError("URLMapping", short_key)
 
         return ExpandedURLResponse.from_url_mapping(url_mapping)
+
+    async def lookup_urls(self, short_keys: list[str]) -> BatchLookupResponse:
+        """
+        Resolve many short keys without recording clicks.
+        Keys are answered from the cache first, the rest with a single query.
+        Results keep the request order; unknown keys are listed in ``missing``.
+        """
+        unique_keys = list(dict.fromkeys(short_keys))
+
+        found: dict[str, URLMapping] = {}
+        misses = []
+        for short_key in unique_keys:
+            cached_url = cache.get_url_value(short_key)
+            if cached_url:
+                found[short_key] = cached_url
+            else:
+                misses.append(short_key)
+
+        for url_mapping in await self.get_many(misses):
+            found[url_mapping.short_key] = url_mapping
+
+        return BatchLookupResponse(
+            results=[ExpandedURLResponse.from_url_mapping(found[key]) for key in unique_keys if key in found],
+            missing=[key for key in unique_keys if key not in found],
+        )
+
+    async def list_urls(
+        self,
+        limit: int = 50,
+        cursor: str | None = None,
+        domain: str | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        min_clicks: int | None = None,
+        search: str | None = None,
+    ) -> URLListResponse:
+        """
+        List URL mappings newest first, using keyset pagination on (created_at, id).
+        A domain filter is served by the (host, created_at, id) index and a
+        substring search by the trigram index on original_url, so every page costs
+        the same no matter how deep it is or how large the table grows.
+        When sharded, every shard returns its own first page and they are merged.
+        """
+        stmt = (
+            select(URLMapping)
+            .order_by(URLMapping.created_at.desc(), URLMapping.id.desc())
+            .limit(limit + 1)  # one extra row tells us whether there is a next page
+        )
+
+        if cursor:
+            cursor_created_at, cursor_id = decode_list_cursor(cursor)
+            stmt = stmt.where(tuple_(URLMapping.created_at, URLMapping.id) < (cursor_created_at, cursor_id))
+        if domain:
+            stmt = stmt.where(URLMapping.host == domain.lower())
+        if created_after:
+            stmt = stmt.where(URLMapping.created_at >= created_after)
+        if created_before:
+            stmt = stmt.where(URLMapping.created_at < created_before)
+        if min_clicks is not None:
+            stmt = stmt.where(URLMapping.clicks_count >= min_clicks)
+        if search:
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            stmt = stmt.where(URLMapping.original_url.ilike(f"%{escaped}%", escape="\\"))
+
+        async def fetch(shard: str | None) -> list[URLMapping]:
+            async with self.session_for(shard) as db:
+                return list((await db.exec(stmt)).all())
+
+        pages = await fan_out(fetch)
+        newest_first = unique_by_id(heapq.merge(*pages, key=lambda url: (url.created_at, url.id), reverse=True))
+        rows = list(itertools.islice(newest_first, limit + 1))
+        page = rows[:limit]
+
+        return URLListResponse(
+            items=[ExpandedURLResponse.from_url_mapping(url_mapping) for url_mapping in page],
+            next_cursor=encode_list_cursor(page[-1]) if len(rows) > limit else None,
+        )
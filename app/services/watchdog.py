@@ -0,0 +1,164 @@
+import asyncio
+import bisect
+import functools
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+from app.config import settings
+from app.logger import logger
+from app.services.admission import admission_controller
+
+# Upper bounds (ms) of the lag histogram buckets, the last bucket is unbounded
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Innermost frames kept in logged stacks; the ASGI middleware chain above them is noise
+STACK_DEPTH = 15
+
+
+class LagHistogram:
+    """Cumulative, Prometheus-style histogram of event-loop lag."""
+
+    def __init__(self, buckets: tuple[float, ...] = LAG_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, lag: float) -> None:
+        ms = lag * 1000
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts, strict=True):
+            running += count
+            cumulative[str(bound)] = running
+        return {"le_ms": cumulative, "count": self.count, "sum_ms": self.sum, "max_ms": self.max}
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop lag continuously and attributes stalls.
+
+    A task on the loop wakes up every ``interval`` and records how late it was
+    into the histogram (and the admission controller). A helper thread watches
+    that heartbeat: when the loop has not ticked for ``blocked_ms``, it grabs the
+    loop thread's stack while the blocking code is still running and logs it
+    with the route of the request being served.
+    """
+
+    def __init__(self, interval: float, blocked_ms: float):
+        self.interval = interval
+        self.blocked = blocked_ms / 1000
+        self.histogram = LagHistogram()
+        self.stalls = 0
+        self.last_stall: dict | None = None
+        # Route served by each request task, filled in by LoopWatchdogMiddleware
+        self.routes: dict[asyncio.Task, str] = {}
+        self._heartbeat = time.monotonic()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        helper = threading.Thread(
+            target=self._watch, args=(loop, threading.get_ident(), stop), name="loop-watchdog", daemon=True
+        )
+        helper.start()
+        try:
+            while True:
+                self._heartbeat = time.monotonic()
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, loop.time() - expected)
+                self.histogram.observe(lag)
+                admission_controller.record_loop_lag(lag)
+        finally:
+            stop.set()
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, loop_thread: int, stop: threading.Event) -> None:
+        reported = None
+        while not stop.wait(self.blocked / 2):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.blocked or heartbeat == reported:
+                continue
+            reported = heartbeat  # one report per stall
+
+            frame = sys._current_frames().get(loop_thread)
+            task = asyncio.current_task(loop)
+            route = self.routes.get(task, "no request") if task else "no task"
+            self.stalls += 1
+            self.last_stall = {"route": route, "stalled_ms": stalled_for * 1000, "at": time.time()}
+            stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH)) if frame else "(stack unavailable)\n"
+            logger.warning(
+                f"Event loop blocked for {stalled_for * 1000:.0f}ms+ while serving {route}:\n{stack}",
+                extra={"event": "loop_blocked"},
+            )
+
+    def snapshot(self) -> dict:
+        return {"lag": self.histogram.snapshot(), "stalls": self.stalls, "last_stall": self.last_stall}
+
+
+loop_watchdog = LoopWatchdog(settings.LOOP_WATCHDOG_INTERVAL, settings.LOOP_WATCHDOG_BLOCKED_MS)
+
+
+class LoopWatchdogMiddleware:
+    """Remembers which route each request task serves, so stalls can be attributed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        task = asyncio.current_task()
+        if scope["type"] != "http" or task is None:
+            await self.app(scope, receive, send)
+            return
+
+        loop_watchdog.routes[task] = f"{scope['method']} {scope['path']}"
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            loop_watchdog.routes.pop(task, None)
+
+
+def _flag_on_loop(name: str, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass  # not on the loop thread (e.g. run_in_executor), blocking is fine
+        else:
+            stack = "".join(traceback.format_stack(limit=STACK_DEPTH + 1)[:-1])
+            logger.warning(f"Blocking call {name} on the event loop:\n{stack}", extra={"event": "blocking_call"})
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def install_blocking_call_checks() -> None:
+    """
+    Wrap well-known blocking APIs so calling them from a coroutine is logged.
+    Meant for tests and local runs (LOOP_BLOCKING_CALL_CHECKS); references taken
+    with ``from module import name`` before this runs are not covered.
+    """
+    targets = [(time, "sleep"), (socket, "getaddrinfo"), (socket, "create_connection"), (subprocess, "run")]
+    try:
+        import requests
+
+        targets.append((requests.Session, "request"))
+    except ImportError:
+        pass
+
+    for owner, name in targets:
+        original = getattr(owner, name)
+        if not getattr(original, "__wrapped__", None):
+            setattr(owner, name, _flag_on_loop(f"{getattr(owner, '__name__', owner)}.{name}", original))
@@ -0,0 +1,40 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
+
+def build_template_env(auto_reload: bool = False) -> "Environment":
+    """
+    Compiled templates are kept in a bytecode cache (filled by ``python -m app.assets``)
+    and, unless ``auto_reload`` is set, never re-checked against the source files on render.
+    """
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    from app.assets import TEMPLATES_DIR, TEMPLATE_BYTECODE_DIR, asset_url
+
+    TEMPLATE_BYTECODE_DIR.mkdir(exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=FileSystemBytecodeCache(str(TEMPLATE_BYTECODE_DIR)),
+        auto_reload=auto_reload,
+        autoescape=True,
+    )
+    env.globals["asset_url"] = asset_url
+    return env
+
+
+@lru_cache(maxsize=1)
+def get_template_env() -> "Environment":
+    """
+    Build the Jinja2 environment on the first rendered page.
+    Jinja2 is only imported here, so API-only processes never load it.
+    """
+    from app.config import settings
+
+    return build_template_env(auto_reload=settings.DEBUG)
+
+
+def render_template(name: str, **context) -> str:
+    return get_template_env().get_template(name).render(context)
@@ -1,7 +1,5 @@
 from urllib.parse import urlparse
 
-import requests
-
 from app.logger import logger
 
 
@@ -30,6 +28,9 @@ def smart_url_schema_detection(url: str) -> str:
 
 
 def test_url_availability(url: str, timeout: int = 3):
+    # Only needed for scheme-less URLs, so keep it off the import path
+    import requests
+
     try:
         response = requests.head(
             url,
@@ -7,6 +7,7 @@ from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from app.config import settings
+from app.models.idempotency import *  # noqa: F403
 from app.models.url import *  # noqa: F403
 from app.models.url import BaseSQLModel
 
@@ -14,7 +15,9 @@ from app.models.url import BaseSQLModel
 # access to the values within the .ini file in use.
 config = context.config
 
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+# `alembic -x shard=<name> upgrade head` migrates one of SHARD_DATABASE_URLS instead
+shard = context.get_x_argument(as_dictionary=True).get("shard")
+config.set_main_option("sqlalchemy.url", settings.SHARD_DATABASE_URLS[shard] if shard else settings.DATABASE_URL)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
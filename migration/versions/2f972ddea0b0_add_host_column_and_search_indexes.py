@@ -0,0 +1,52 @@
+"""add host column and search indexes.
+
+Adds the generated ``host`` column with a (host, created_at, id) index for
+domain listings, a (created_at, id) index for the unfiltered listing and a
+pg_trgm GIN index on original_url for substring search. Adding a stored
+generated column rewrites the table, so run it in a maintenance window.
+
+Revision ID: 2f972ddea0b0
+Revises: aebd7d181dad
+Create Date: 2026-10-19 11:12:40.118205
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2f972ddea0b0"
+down_revision: Union[str, Sequence[str], None] = "aebd7d181dad"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HOST_EXPRESSION = r"lower(substring(original_url from '^[A-Za-z][A-Za-z0-9+.-]*://(?:[^/?#@]*@)?([^/?#:]+)'))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "url_mapping",
+        sa.Column("host", sa.String(length=255), sa.Computed(HOST_EXPRESSION, persisted=True), nullable=True),
+    )
+    op.create_index("ix_url_mapping_host_created_at", "url_mapping", ["host", "created_at", "id"], unique=False)
+    op.create_index("ix_url_mapping_created_at", "url_mapping", ["created_at", "id"], unique=False)
+    op.create_index(
+        "ix_url_mapping_original_url_trgm",
+        "url_mapping",
+        ["original_url"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"original_url": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_url_mapping_original_url_trgm", table_name="url_mapping")
+    op.drop_index("ix_url_mapping_created_at", table_name="url_mapping")
+    op.drop_index("ix_url_mapping_host_created_at", table_name="url_mapping")
+    op.drop_column("url_mapping", "host")
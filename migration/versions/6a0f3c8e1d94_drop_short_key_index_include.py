@@ -0,0 +1,43 @@
+"""drop short key index include.
+
+ix_url_mapping_short_key INCLUDEd (original_url, redirect_policy) for
+index-only scans, but redirect lookups load the whole row (counters and
+timestamps are cached and returned too), so they always visit the heap. The
+INCLUDE only copied up to 2 KB of original_url into every index entry. The
+index is rebuilt as a plain unique index on short_key.
+
+Benchmark before/after with scripts/bench_url_mapping.py.
+
+Revision ID: 6a0f3c8e1d94
+Revises: d3e9f1a7c2b5
+Create Date: 2026-10-19 11:53:36.480127
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6a0f3c8e1d94"
+down_revision: Union[str, Sequence[str], None] = "d3e9f1a7c2b5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index("ix_url_mapping_short_key", table_name="url_mapping")
+    op.create_index("ix_url_mapping_short_key", "url_mapping", ["short_key"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_url_mapping_short_key", table_name="url_mapping")
+    op.create_index(
+        "ix_url_mapping_short_key",
+        "url_mapping",
+        ["short_key"],
+        unique=True,
+        postgresql_include=["original_url", "redirect_policy"],
+    )
@@ -0,0 +1,31 @@
+"""add url mapping updated_at index.
+
+Incremental exports (``since``) page on (updated_at, id); without an index
+every page filtered the whole table. Click updates bump updated_at, so they now
+also write this index.
+
+Revision ID: 8c4d2a1f6b37
+Revises: 5b1e0c7d9a42
+Create Date: 2026-10-19 11:42:17.904126
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c4d2a1f6b37"
+down_revision: Union[str, Sequence[str], None] = "5b1e0c7d9a42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_url_mapping_updated_at", "url_mapping", ["updated_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_url_mapping_updated_at", table_name="url_mapping")
@@ -0,0 +1,33 @@
+"""add idempotency key heartbeat.
+
+Adds ``heartbeat_at``, renewed by the worker running a request and cleared once
+it completed. A claim whose heartbeat is older than IDEMPOTENCY_LEASE was left
+behind by a worker that died and is taken over by the next retry, instead of
+blocking it until the row expires.
+
+Revision ID: a71c5e2b9f08
+Revises: 6a0f3c8e1d94
+Create Date: 2026-10-19 11:59:48.662310
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a71c5e2b9f08"
+down_revision: Union[str, Sequence[str], None] = "6a0f3c8e1d94"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("idempotency_key", sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("idempotency_key", "heartbeat_at")
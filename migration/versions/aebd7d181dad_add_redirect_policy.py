@@ -0,0 +1,31 @@
+"""add redirect policy to url mapping.
+
+Revision ID: aebd7d181dad
+Revises: 37c8fc365f07
+Create Date: 2026-10-19 11:10:12.604311
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "aebd7d181dad"
+down_revision: Union[str, Sequence[str], None] = "37c8fc365f07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "url_mapping",
+        sa.Column("redirect_policy", sa.String(length=16), server_default="tracked", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("url_mapping", "redirect_policy")
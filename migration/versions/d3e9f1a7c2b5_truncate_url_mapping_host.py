@@ -0,0 +1,49 @@
+"""truncate url mapping host.
+
+The generated ``host`` column is varchar(255) but the expression was not
+bounded, so inserting a URL whose authority is longer than 255 characters
+failed. The expression is now wrapped in ``left(..., 255)``. A generated
+column's expression cannot be altered before Postgres 17, so the column and
+its index are re-created, which rewrites the table: run it in a maintenance
+window.
+
+Revision ID: d3e9f1a7c2b5
+Revises: 8c4d2a1f6b37
+Create Date: 2026-10-19 11:47:02.215839
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d3e9f1a7c2b5"
+down_revision: Union[str, Sequence[str], None] = "8c4d2a1f6b37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HOST_PATTERN = r"'^[A-Za-z][A-Za-z0-9+.-]*://(?:[^/?#@]*@)?([^/?#:]+)'"
+HOST_EXPRESSION = rf"left(lower(substring(original_url from {HOST_PATTERN})), 255)"
+PREVIOUS_HOST_EXPRESSION = rf"lower(substring(original_url from {HOST_PATTERN}))"
+
+
+def _replace_host_column(expression: str) -> None:
+    op.drop_index("ix_url_mapping_host_created_at", table_name="url_mapping")
+    op.drop_column("url_mapping", "host")
+    op.add_column(
+        "url_mapping",
+        sa.Column("host", sa.String(length=255), sa.Computed(expression, persisted=True), nullable=True),
+    )
+    op.create_index("ix_url_mapping_host_created_at", "url_mapping", ["host", "created_at", "id"], unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_host_column(HOST_EXPRESSION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_host_column(PREVIOUS_HOST_EXPRESSION)
@@ -0,0 +1,32 @@
+"""add idempotency key claim token.
+
+Adds ``claim_token``, a random value written by each claim. Renewing,
+completing and releasing a claim match on it, so a request whose lease was
+taken over can no longer touch the row of the request that took it over.
+
+Revision ID: f24b8d6e0c13
+Revises: a71c5e2b9f08
+Create Date: 2026-10-19 12:21:05.371942
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f24b8d6e0c13"
+down_revision: Union[str, Sequence[str], None] = "a71c5e2b9f08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("idempotency_key", sa.Column("claim_token", sa.Uuid(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("idempotency_key", "claim_token")
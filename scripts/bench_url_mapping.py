@@ -0,0 +1,106 @@
+"""Redirect-lookup and insert benchmark for the url_mapping table.
+
+Run it against the same database before and after ``alembic upgrade`` to compare
+schema changes. Lookups use keys sampled from the table; inserts run inside a
+transaction that is rolled back, so the table is left untouched.
+
+Usage: DATABASE_URL=postgresql+asyncpg://... python scripts/bench_url_mapping.py [--lookups 20000] [--inserts 5000]
+"""
+
+import argparse
+import asyncio
+import os
+import secrets
+import statistics
+import string
+import time
+import uuid
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+LOOKUP_QUERIES = {
+    # What load_url_mapping sends: the whole row, cached and served by expand_url
+    "full row": "SELECT * FROM url_mapping WHERE short_key = $1",
+    # Only the redirect target, for comparison
+    "redirect columns": "SELECT original_url, redirect_policy FROM url_mapping WHERE short_key = $1",
+}
+
+INSERT_QUERY = """
+    INSERT INTO url_mapping (id, short_key, original_url, clicks_count, created_at, updated_at)
+    VALUES ($1, $2, $3, 0, now(), now())
+"""
+
+
+def report(name: str, latencies: list[float], elapsed: float) -> None:
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:<18} {len(latencies) / elapsed:10.0f} ops/s"
+        f"   p50 {statistics.median(latencies) * 1000:7.3f} ms   p99 {p99 * 1000:7.3f} ms"
+    )
+
+
+async def bench_lookups(pool: asyncpg.Pool, keys: list[str], total: int, concurrency: int) -> None:
+    for name, query in LOOKUP_QUERIES.items():
+        latencies: list[float] = []
+
+        async def worker(count: int, query: str = query, latencies: list[float] = latencies) -> None:
+            async with pool.acquire() as conn:
+                statement = await conn.prepare(query)
+                for _ in range(count):
+                    start = time.perf_counter()
+                    await statement.fetchrow(secrets.choice(keys))
+                    latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(total // concurrency) for _ in range(concurrency)))
+        report(f"lookup/{name}", latencies, time.perf_counter() - started)
+
+    async with pool.acquire() as conn:
+        plan = await conn.fetch("EXPLAIN (ANALYZE, BUFFERS) " + LOOKUP_QUERIES["full row"], secrets.choice(keys))
+        print("\n".join(row[0] for row in plan))
+
+
+async def bench_inserts(pool: asyncpg.Pool, total: int) -> None:
+    alphabet = string.ascii_letters + string.digits
+    latencies: list[float] = []
+    async with pool.acquire() as conn:
+        statement = await conn.prepare(INSERT_QUERY)
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            started = time.perf_counter()
+            for _ in range(total):
+                key = "".join(secrets.choice(alphabet) for _ in range(8))
+                start = time.perf_counter()
+                await statement.fetch(uuid.uuid4(), key, f"https://bench.example.com/{key}")
+                latencies.append(time.perf_counter() - start)
+            report("insert", latencies, time.perf_counter() - started)
+        finally:
+            await transaction.rollback()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--inserts", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    dsn = make_url(os.environ["DATABASE_URL"]).set(drivername="postgresql").render_as_string(hide_password=False)
+    pool = await asyncpg.create_pool(dsn, min_size=args.concurrency, max_size=args.concurrency)
+    try:
+        await pool.execute("VACUUM ANALYZE url_mapping")  # fresh statistics and visibility map
+        keys = [row[0] for row in await pool.fetch("SELECT short_key FROM url_mapping ORDER BY random() LIMIT 10000")]
+        if not keys:
+            raise SystemExit("url_mapping is empty, seed it before benchmarking")
+
+        await bench_lookups(pool, keys, args.lookups, args.concurrency)
+        await bench_inserts(pool, args.inserts)
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
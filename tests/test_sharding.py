@@ -0,0 +1,91 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.config import settings
+from app.database import sharding
+from app.database.sharding import ShardMap
+from app.services import export
+
+KEYS = [f"key{i}" for i in range(10_000)]
+
+
+@pytest.fixture
+def shard_settings(monkeypatch):
+    def configure(shards: list[str], previous: list[str] | None = None) -> None:
+        monkeypatch.setattr(settings, "SHARD_DATABASE_URLS", {shard: f"postgresql://db/{shard}" for shard in shards})
+        monkeypatch.setattr(settings, "SHARD_PREVIOUS_NAMES", previous or [])
+        sharding.get_shard_map.cache_clear()
+        sharding.get_previous_shard_map.cache_clear()
+
+    yield configure
+    sharding.get_shard_map.cache_clear()
+    sharding.get_previous_shard_map.cache_clear()
+
+
+def test_placement_is_stable():
+    first, second = ShardMap(["a", "b", "c"]), ShardMap(["c", "a", "b"])
+    assert [first.shard_for(key) for key in KEYS] == [second.shard_for(key) for key in KEYS]
+
+
+def test_every_shard_gets_keys():
+    owners = ShardMap(["a", "b", "c"]).group_by_shard(KEYS)
+    assert set(owners) == {"a", "b", "c"}
+    assert all(len(keys) > len(KEYS) / 6 for keys in owners.values())
+
+
+def test_adding_a_shard_only_moves_keys_to_it():
+    before, after = ShardMap(["a", "b", "c"]), ShardMap(["a", "b", "c", "d"])
+    moved = [key for key in KEYS if before.shard_for(key) != after.shard_for(key)]
+
+    assert all(after.shard_for(key) == "d" for key in moved)
+    # About 1/4 of the keys, nowhere near a full reshuffle
+    assert len(KEYS) / 8 < len(moved) < len(KEYS) / 2
+
+
+def test_shards_for_key_without_rebalance(shard_settings):
+    shard_settings(["a", "b"])
+    assert all(sharding.shards_for_key(key) == [sharding.shard_for_key(key)] for key in KEYS[:500])
+    assert sharding.group_keys_by_previous_shard(KEYS[:500]) == {}
+
+
+def test_shards_for_key_falls_back_to_previous_owner(shard_settings):
+    shard_settings(["a", "b", "c"], previous=["a", "b"])
+    previous_map = ShardMap(["a", "b"])
+
+    for key in KEYS[:500]:
+        owner, previous = sharding.shard_for_key(key), previous_map.shard_for(key)
+        expected = [owner] if owner == previous else [owner, previous]
+        assert sharding.shards_for_key(key) == expected
+
+    moved = sharding.group_keys_by_previous_shard(KEYS[:500])
+    assert moved
+    assert all(sharding.shard_for_key(key) == "c" for keys in moved.values() for key in keys)
+
+
+def test_unique_by_id_drops_adjacent_copies():
+    first, second = uuid.uuid4(), uuid.uuid4()
+    rows = [{"id": first}, {"id": first}, {"id": second}]
+    assert list(sharding.unique_by_id(rows)) == [{"id": first}, {"id": second}]
+
+
+def test_export_merges_shards_and_skips_copies(shard_settings, monkeypatch):
+    shard_settings(["a", "b"])
+    ids = sorted(uuid.uuid4() for _ in range(6))
+    # ids[2] is on both shards, as mid-rebalance
+    shard_rows = {"a": [ids[0], ids[2], ids[3]], "b": [ids[1], ids[2], ids[4], ids[5]]}
+
+    async def fake_batches(shard, since, batch_size):
+        rows = [{"id": row_id, "updated_at": None} for row_id in shard_rows[shard]]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start : start + batch_size]
+
+    monkeypatch.setattr(export, "_iter_shard_batches", fake_batches)
+
+    async def collect() -> list[list[dict]]:
+        return [rows async for rows in export.iter_url_mapping_batches(batch_size=4)]
+
+    batches = asyncio.run(collect())
+    assert [len(rows) for rows in batches] == [4, 2]
+    assert [row["id"] for rows in batches for row in rows] == ids
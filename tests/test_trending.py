@@ -0,0 +1,49 @@
+import random
+from collections import Counter
+
+from app.services.trending import SpaceSaving
+
+
+def zipf_stream(size: int, keys: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, keys + 1)]
+    return rng.choices([f"k{rank}" for rank in range(keys)], weights=weights, k=size)
+
+
+def sketch_of(stream: list[str], capacity: int) -> SpaceSaving:
+    sketch = SpaceSaving(capacity)
+    for key in stream:
+        sketch.add(key)
+    return sketch
+
+
+def assert_bounds(sketch: SpaceSaving, true_counts: Counter) -> None:
+    for key, count in sketch.counts.items():
+        assert count - sketch.errors[key] <= true_counts[key] <= count, key
+    # A key that is not held was seen at most as often as the least counted one
+    floor = min(sketch.counts.values())
+    assert all(count <= floor for key, count in true_counts.items() if key not in sketch.counts)
+
+
+def test_single_sketch_bounds():
+    stream = zipf_stream(20_000, 500, seed=1)
+    assert_bounds(sketch_of(stream, 50), Counter(stream))
+
+
+def test_merged_sketch_keeps_the_bounds():
+    streams = [zipf_stream(10_000, 500, seed=seed) for seed in range(4)]
+    # Each worker or window sees its own shuffle, so they evict different keys
+    for seed, stream in enumerate(streams):
+        random.Random(seed).shuffle(stream)
+
+    merged = SpaceSaving.merge(sketch_of(stream, 50) for stream in streams)
+
+    assert len(merged.counts) == 50
+    assert_bounds(merged, Counter(key for stream in streams for key in stream))
+
+
+def test_merge_of_sketches_that_never_evicted_is_exact():
+    first, second = ["a", "b", "a"], ["b", "c"]
+    merged = SpaceSaving.merge([sketch_of(first, 10), sketch_of(second, 10)])
+    assert merged.counts == {"a": 2, "b": 2, "c": 1}
+    assert set(merged.errors.values()) == {0}